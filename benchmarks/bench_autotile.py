@@ -0,0 +1,56 @@
+import argparse
+import random
+import time
+
+from benchmarks.common import synthetic_map_data
+from scripts.tilemap import Tilemap, AUTOTILE_MAP, AUTOTILE_TYPES
+
+
+def legacy_autotile(tilemap):
+    for loc in tilemap:
+        tile = tilemap[loc]
+        neighbors = set()
+        for shift in [(1, 0), (-1, 0), (0, -1), (0, 1)]:
+            check_loc = str(tile['pos'][0] + shift[0]) + ';' + str(tile['pos'][1] + shift[1])
+            if check_loc in tilemap:
+                if tilemap[check_loc]['type'] == tile['type']:
+                    neighbors.add(shift)
+        neighbors = tuple(sorted(neighbors))
+        if (tile['type'] in AUTOTILE_TYPES) and (neighbors in AUTOTILE_MAP):
+            tile['variant'] = AUTOTILE_MAP[neighbors]
+
+
+def timed(fn):
+    start = time.perf_counter()
+    fn()
+    return (time.perf_counter() - start) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--size', type=int, default=1000)
+    parser.add_argument('--density', type=float, default=0.5)
+    parser.add_argument('--edits', type=int, default=100)
+    args = parser.parse_args()
+
+    map_data = synthetic_map_data(args.size, args.size, density=args.density)
+    tilemap = Tilemap(None)
+    tilemap.load_map_data(map_data)
+    print('synthetic ' + str(args.size) + 'x' + str(args.size) + ' (' + str(len(tilemap.grid)) + ' tiles)')
+
+    print('  {:<28}{:>10.1f} ms'.format('legacy full pass', timed(lambda: legacy_autotile(map_data['tilemap']))))
+    print('  {:<28}{:>10.1f} ms'.format('full pass', timed(lambda: tilemap.autotile(full=True))))
+
+    rng = random.Random(1)
+    for _ in range(args.edits):
+        loc = (rng.randrange(args.size), rng.randrange(args.size))
+        if rng.random() < 0.5:
+            tilemap.set_tile(loc, rng.choice(['grass', 'stone']), 0)
+        else:
+            tilemap.remove_tile(loc)
+    label = 'incremental (' + str(args.edits) + ' edits)'
+    print('  {:<28}{:>10.3f} ms'.format(label, timed(tilemap.autotile)))
+
+
+if __name__ == '__main__':
+    main()
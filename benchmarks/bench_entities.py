@@ -0,0 +1,92 @@
+import argparse
+import random
+import time
+import tracemalloc
+
+from benchmarks.common import headless_display, ns_per_call
+from scripts.entities import Enemy, Player
+from scripts.particle import ParticleSystem
+from scripts.projectile import ProjectileSystem
+from scripts.spark import SparkSystem
+from scripts.tilemap import Tilemap
+from scripts.utils import load_image, load_images, AnimationClip, SpriteCache
+
+
+class Silent:
+    def play(self, *args):
+        pass
+
+
+class EntityWorld:
+    def __init__(self, width):
+        self.assets = {
+            'enemy/idle': AnimationClip(load_images('entities/enemy/idle'), img_dur=6),
+            'enemy/run': AnimationClip(load_images('entities/enemy/run'), img_dur=4),
+            'player/idle': AnimationClip(load_images('entities/player/idle'), img_dur=6),
+            'particle/particle': AnimationClip(load_images('particles/particle'), img_dur=6, loop=False),
+            'gun': load_image('gun.png'),
+            'shotgun': load_image('shotgun.png'),
+            'rifle': load_image('rifle.png'),
+            'projectile': load_image('projectile.png'),
+        }
+        self.sprites = SpriteCache()
+        self.sfx = {name: Silent() for name in ['shoot', 'shotgun', 'rifle', 'hit']}
+        self.projectiles = ProjectileSystem(self.assets['projectile'])
+        self.sparks = SparkSystem()
+        self.particles = ParticleSystem(self.assets)
+        self.screenshake = 0
+        self.dead = 0
+        self.tilemap = Tilemap(self, tile_size=16)
+        floor = {str(x) + ';10': {'type': 'stone', 'variant': 1, 'pos': [x, 10]} for x in range(width)}
+        self.tilemap.load_map_data({'tilemap': floor, 'tile_size': 16, 'offgrid': []})
+        self.player = Player(self, (0, 0), (8, 15))
+
+
+def spawn_enemies(world, count):
+    random.seed(0)
+    return [Enemy(world, (i * 32 + 8, 145), (8, 15)) for i in range(count)]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--count', type=int, default=1000)
+    parser.add_argument('--frames', type=int, default=100)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    surf = headless_display()
+    world = EntityWorld(args.count * 2 + 2)
+
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    enemies = spawn_enemies(world, args.count)
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    random.seed(1)
+    update_ms = None
+    for _ in range(args.repeat):
+        start = time.perf_counter()
+        for _ in range(args.frames):
+            for enemy in enemies:
+                enemy.update(world.tilemap, (0, 0))
+        elapsed = (time.perf_counter() - start) * 1000 / args.frames
+        update_ms = elapsed if update_ms is None else min(update_ms, elapsed)
+
+    start = time.perf_counter()
+    for _ in range(args.frames):
+        for enemy in enemies[:50]:
+            enemy.render(surf, offset=(enemy.pos[0] - 160, 0))
+    render_ms = (time.perf_counter() - start) * 1000 / args.frames
+
+    rect_ns = ns_per_call(lambda enemy: enemy.rect(), enemies)
+
+    print(str(args.count) + ' enemies')
+    print('  {:<28}{:>10.0f} bytes'.format('memory per enemy', (after - before) / args.count))
+    print('  {:<28}{:>10.3f} ms'.format('update per frame', update_ms))
+    print('  {:<28}{:>10.3f} ms'.format('render 50 per frame', render_ms))
+    print('  {:<28}{:>10.0f} ns'.format('rect() per call', rect_ns))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,46 @@
+import os
+import argparse
+import tempfile
+import time
+
+from benchmarks.common import synthetic_map_data, ns_per_call
+from scripts.levels import LevelCache, LevelPrefetcher, prepare_level
+from scripts.mapfile import write_json
+from scripts.tilemap import Tilemap
+
+
+def bench(name, path, repeat):
+    tilemap = Tilemap(None)
+    cache = LevelCache()
+    cache.put(prepare_level(tilemap, 0, path))
+
+    cold = ns_per_call(lambda _: prepare_level(tilemap, 0, path), range(repeat)) / 1e6
+    warm = ns_per_call(lambda _: tilemap.restore(cache.get(0).tilemap), range(repeat)) / 1e6
+
+    prefetcher = LevelPrefetcher(LevelCache(), lambda: Tilemap(None), lambda map_id: path)
+    prefetcher.request(1)
+    while not prefetcher.ready(1):
+        time.sleep(0.001)
+    handover = ns_per_call(lambda _: tilemap.restore(prefetcher.take(1).tilemap), range(repeat)) / 1e6
+    print('  {:<30}{:>10.3f} ms -> {:>8.3f} ms  ({:.1f}x), prefetched handover {:.3f} ms'.format(
+        name, cold, warm, cold / warm, handover))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--size', type=int, default=300)
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    print('restart latency: disk load + extract -> cached snapshot restore')
+    for map_id in range(3):
+        bench('assets/maps/' + str(map_id) + '.json', 'assets/maps/' + str(map_id) + '.json', args.repeat)
+
+    with tempfile.TemporaryDirectory() as workdir:
+        path = os.path.join(workdir, 'synthetic.json')
+        write_json(path, synthetic_map_data(args.size, args.size))
+        bench('synthetic ' + str(args.size) + 'x' + str(args.size), path, max(1, args.repeat // 4))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,65 @@
+import os
+import argparse
+import tempfile
+import time
+import tracemalloc
+
+from benchmarks.common import load_map_data, synthetic_map_data
+from scripts.mapfile import write_json, write_map, grid_from_json
+from scripts.tilemap import Tilemap
+
+
+def measure(fn, repeat=5):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    tracemalloc.start()
+    result = fn()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return best * 1000, peak / 1024, result
+
+
+def load(path, decode_all=False):
+    tilemap = Tilemap(None)
+    tilemap.load(path)
+    if decode_all:
+        tilemap.grid.fetch_all()
+    tilemap.close()
+
+
+def bench(name, map_data, workdir):
+    json_path = os.path.join(workdir, 'map.json')
+    binary_path = os.path.join(workdir, 'map.map')
+    write_json(json_path, map_data)
+    write_map(binary_path, grid_from_json(map_data), map_data['tile_size'], map_data['offgrid'])
+
+    print(name + ' (' + str(len(map_data['tilemap'])) + ' tiles, json ' + str(os.path.getsize(json_path) // 1024) +
+          ' KB, binary ' + str(os.path.getsize(binary_path) // 1024) + ' KB)')
+    for label, fn in [
+        ('json load', lambda: load(json_path)),
+        ('binary open (lazy)', lambda: load(binary_path)),
+        ('binary full decode', lambda: load(binary_path, decode_all=True)),
+    ]:
+        ms, kb, _ = measure(fn)
+        print('  {:<20}{:>10.2f} ms {:>10.0f} KB peak'.format(label, ms, kb))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--size', type=int, default=1000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        for map_id in range(3):
+            path = 'assets/maps/' + str(map_id) + '.json'
+            bench(path, load_map_data(path), workdir)
+        bench('synthetic ' + str(args.size) + 'x' + str(args.size), synthetic_map_data(args.size, args.size),
+              workdir)
+
+
+if __name__ == '__main__':
+    main()
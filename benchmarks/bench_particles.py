@@ -0,0 +1,94 @@
+import argparse
+import random
+
+from benchmarks.common import headless_display, frame_ms
+from scripts.particle import ParticleSystem
+from scripts.utils import load_images, AnimationClip
+
+
+class LegacyParticle:
+    def __init__(self, game, p_type, pos, velocity=None, frame=0):
+        if velocity is None:
+            velocity = [0, 0]
+        self.game = game
+        self.type = p_type
+        self.pos = list(pos)
+        self.velocity = list(velocity)
+        self.animation = self.game.assets['particle/' + p_type].play(frame)
+
+    def update(self):
+        kill = False
+        if self.animation.done:
+            kill = True
+
+        self.pos[0] += self.velocity[0]
+        self.pos[1] += self.velocity[1]
+
+        self.animation.update()
+
+        return kill
+
+    def render(self, surf, offset=(0, 0)):
+        img = self.animation.img()
+        surf.blit(img, (self.pos[0] - offset[0] - img.get_width() // 2,
+                        self.pos[1] - offset[1] - img.get_height() // 2))
+
+
+class AssetHolder:
+    def __init__(self, assets):
+        self.assets = assets
+
+
+def particle_assets(loop=True):
+    return {
+        'particle/leaf': AnimationClip(load_images('particles/leaf'), img_dur=20, loop=loop),
+        'particle/particle': AnimationClip(load_images('particles/particle'), img_dur=6, loop=loop),
+    }
+
+
+def legacy_frame(particles, surf):
+    for particle in particles.copy():
+        kill = particle.update()
+        particle.render(surf)
+        if kill:
+            particles.remove(particle)
+
+
+def batched_frame(system, surf):
+    system.update()
+    system.render(surf)
+
+
+def bench(count, frames, surf):
+    assets = particle_assets()
+    game = AssetHolder(assets)
+    rng = random.Random(0)
+    particles = []
+    system = ParticleSystem(assets)
+    for i in range(count):
+        p_type = 'leaf' if i % 2 else 'particle'
+        pos = (rng.random() * 320, rng.random() * 240)
+        velocity = (rng.random() - 0.5, rng.random() - 0.5)
+        frame = rng.randint(0, 7)
+        particles.append(LegacyParticle(game, p_type, pos, velocity, frame))
+        system.spawn(p_type, pos, velocity, frame)
+
+    legacy = frame_ms(lambda: legacy_frame(particles, surf), frames)
+    batched = frame_ms(lambda: batched_frame(system, surf), frames)
+    print('  {:<12}{:>10.2f} ms -> {:>8.2f} ms  ({:.1f}x)'.format(str(count), legacy, batched, legacy / batched))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--counts', type=int, nargs='+', default=[1000, 10000])
+    parser.add_argument('--frames', type=int, default=20)
+    args = parser.parse_args()
+
+    surf = headless_display()
+    print('particle update + render per frame: Particle list -> ParticleSystem')
+    for count in args.counts:
+        bench(count, args.frames, surf)
+
+
+if __name__ == '__main__':
+    main()
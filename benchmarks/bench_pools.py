@@ -0,0 +1,123 @@
+import argparse
+import gc
+import math
+import random
+import statistics
+import time
+
+from benchmarks.bench_particles import AssetHolder, LegacyParticle, particle_assets
+from benchmarks.bench_sparks import LegacySpark
+from benchmarks.common import headless_display
+from scripts.particle import ParticleSystem
+from scripts.spark import SparkSystem
+
+
+class GCMonitor:
+    def __init__(self):
+        self.collections = 0
+        self.pause_ns = 0
+        self.longest_ns = 0
+        self.start = 0
+
+    def __call__(self, phase, info):
+        if phase == 'start':
+            self.start = time.perf_counter_ns()
+        else:
+            pause = time.perf_counter_ns() - self.start
+            self.collections += 1
+            self.pause_ns += pause
+            self.longest_ns = max(self.longest_ns, pause)
+
+
+def bursts(frames, seed=0):
+    rng = random.Random(seed)
+    for frame in range(frames):
+        effects = []
+        if frame % 6 == 0:
+            center = (rng.random() * 320, rng.random() * 240)
+            for _ in range(30):
+                angle = rng.random() * math.pi * 2
+                speed = rng.random() * 5
+                effects.append(('spark', center, angle, 2 + rng.random()))
+                effects.append(('particle', center, (math.cos(angle) * speed * 0.5, math.sin(angle) * speed * 0.5),
+                                rng.randint(0, 7)))
+        for _ in range(3):
+            effects.append(('particle', (rng.random() * 320, rng.random() * 240),
+                            (rng.random() - 0.5, rng.random() - 0.5), rng.randint(0, 7)))
+        yield effects
+
+
+def run_legacy(frames, surf):
+    game = AssetHolder(particle_assets(loop=False))
+    particles = []
+    sparks = []
+    times = []
+    for effects in bursts(frames):
+        start = time.perf_counter_ns()
+        for effect in effects:
+            if effect[0] == 'spark':
+                sparks.append(LegacySpark(effect[1], effect[2], effect[3]))
+            else:
+                particles.append(LegacyParticle(game, 'particle', effect[1], list(effect[2]), effect[3]))
+        for spark in sparks.copy():
+            kill = spark.update()
+            spark.render(surf)
+            if kill:
+                sparks.remove(spark)
+        for particle in particles.copy():
+            kill = particle.update()
+            particle.render(surf)
+            if kill:
+                particles.remove(particle)
+        times.append(time.perf_counter_ns() - start)
+    return times, None
+
+
+def run_pooled(frames, surf):
+    particles = ParticleSystem(particle_assets(loop=False), capacity=1024)
+    sparks = SparkSystem(capacity=512)
+    times = []
+    for effects in bursts(frames):
+        start = time.perf_counter_ns()
+        for effect in effects:
+            if effect[0] == 'spark':
+                sparks.spawn(effect[1], effect[2], effect[3])
+            else:
+                particles.spawn('particle', effect[1], effect[2], effect[3])
+        sparks.update()
+        sparks.render(surf)
+        particles.update()
+        particles.render(surf)
+        times.append(time.perf_counter_ns() - start)
+    return times, {'particles': particles.stats(), 'sparks': sparks.stats()}
+
+
+def report(name, run, frames, surf):
+    monitor = GCMonitor()
+    gc.collect()
+    gc.callbacks.append(monitor)
+    times, pools = run(frames, surf)
+    gc.callbacks.remove(monitor)
+
+    times = sorted(t / 1e6 for t in times)
+    print('  {:<8} median {:.3f} ms  p99 {:.3f} ms  max {:.3f} ms  |  gc {} runs, {:.2f} ms total, '
+          'longest {:.3f} ms'.format(name, statistics.median(times), times[int(len(times) * 0.99)], times[-1],
+                                     monitor.collections, monitor.pause_ns / 1e6, monitor.longest_ns / 1e6))
+    for pool, stats in (pools or {}).items():
+        print('           {:<10} hits {hits}  misses {misses}  high water {high_water}/{capacity}'.format(
+            pool, **stats))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--frames', type=int, default=3000)
+    args = parser.parse_args()
+
+    surf = headless_display()
+    print('effect churn over ' + str(args.frames) + ' frames (30-spark/30-particle hit burst every 6 frames)')
+    report('objects', run_legacy, args.frames, surf)
+    report('pooled', run_pooled, args.frames, surf)
+
+
+if __name__ == '__main__':
+    main()
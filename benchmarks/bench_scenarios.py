@@ -0,0 +1,240 @@
+import os
+import sys
+import json
+import argparse
+import resource
+import tempfile
+import subprocess
+
+os.environ.setdefault('PYGAME_HIDE_SUPPORT_PROMPT', '1')
+
+from benchmarks.common import load_map_data, tiled_map_data
+from game import Game
+from scripts.entities import Enemy
+from scripts.inputs import ScriptedInput, patrol
+from scripts.levels import prepare_level
+from scripts.mapfile import write_json
+from scripts.profiler import FrameProfiler
+
+RESULT_VERSION = 1
+COUNTED = ['enemies', 'projectiles', 'sparks', 'particles']
+STRESS_ENEMIES = 200
+FIRE_INTERVAL = 30
+BURST_INTERVAL = 10
+BURST_SIZE = 8
+LARGE_MAP_REPEAT = (10, 10)
+
+
+def invulnerable(game, frame):
+    game.dead = 0
+
+
+def shotgun_line(game):
+    game.load_level(0)
+    floor_y = 20
+    for x in range(-STRESS_ENEMIES // 2 - 2, STRESS_ENEMIES // 2 + 2):
+        game.tilemap.set_tile((x, floor_y), 'stone', 1)
+    game.leaf_spawners = []
+    game.player.pos = [0, floor_y * 16 - 15]
+    game.enemies = []
+    for i in range(STRESS_ENEMIES):
+        x = (i - STRESS_ENEMIES // 2) * 16 + 4
+        if abs(x) < 24:
+            x += 48 if x > 0 else -48
+        enemy = Enemy(game, (x, floor_y * 16 - 15), (8, 15))
+        enemy.weapon = 'shotgun'
+        enemy.flip = x > 0
+        game.enemies.append(enemy)
+
+    def hook(game, frame):
+        game.dead = 0
+        if not frame % FIRE_INTERVAL:
+            for enemy in game.enemies:
+                enemy.walking = 0
+                enemy.flip = enemy.pos[0] > game.player.pos[0]
+                enemy.shoot_projectile()
+    return hook
+
+
+def hit_bursts(game):
+    game.load_level(0)
+
+    def hook(game, frame):
+        game.dead = 0
+        if not frame % BURST_INTERVAL:
+            for _ in range(BURST_SIZE):
+                game.handle_player_hit()
+            game.dead = 0
+    return hook
+
+
+def large_map(game):
+    with tempfile.TemporaryDirectory() as workdir:
+        path = os.path.join(workdir, 'large.json')
+        write_json(path, tiled_map_data(load_map_data(game.map_path(2)), *LARGE_MAP_REPEAT))
+        game.enter_level(prepare_level(game.tilemap, 'large', path))
+    return invulnerable
+
+
+def shipped_map(map_id):
+    def setup(game):
+        game.load_level(map_id)
+        game.level = map_id
+    return setup
+
+
+SCENARIOS = {
+    'map0': shipped_map(0),
+    'map1': shipped_map(1),
+    'map2': shipped_map(2),
+    'shotgun_200': shotgun_line,
+    'hit_bursts': hit_bursts,
+    'large_map': large_map,
+}
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))] if ordered else 0
+
+
+def summarize(samples):
+    return {'median_ms': percentile(samples, 0.5) / 1e6, 'p99_ms': percentile(samples, 0.99) / 1e6}
+
+
+def peak_rss_kb():
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss // 1024 if sys.platform == 'darwin' else rss
+
+
+def run_scenario(name, frames, warmup, seed):
+    game = Game(headless=True, seed=seed)
+    hook = SCENARIOS[name](game)
+    inputs = ScriptedInput(patrol)
+    profiler = game.profiler = FrameProfiler(history=frames, enabled=False)
+    peaks = dict.fromkeys(COUNTED, 0)
+
+    for frame in range(warmup + frames):
+        if frame == warmup:
+            profiler.enabled = True
+        profiler.begin_frame()
+        inputs.poll(game)
+        if hook:
+            hook(game, frame)
+        game.update()
+        game.render()
+        profiler.end_frame()
+        for key in COUNTED:
+            peaks[key] = max(peaks[key], len(getattr(game, key)))
+
+    slots = profiler.recorded_slots()
+    frame_times = [profiler.frame_total[slot] for slot in slots]
+    return {
+        'frames': frames,
+        'frame': summarize(frame_times),
+        'ticks_per_sec': len(frame_times) / (sum(frame_times) / 1e9) if frame_times else 0.0,
+        'stages': {stage: summarize([times[slot] for slot in slots]) for stage, times in profiler.stages.items()},
+        'peak': peaks,
+        'peak_rss_kb': peak_rss_kb(),
+    }
+
+
+def run_isolated(name, args):
+    command = [sys.executable, '-m', 'benchmarks.bench_scenarios', 'scenario', name, '--frames', str(args.frames),
+               '--warmup', str(args.warmup), '--seed', str(args.seed)]
+    output = subprocess.run(command, check=True, stdout=subprocess.PIPE, universal_newlines=True).stdout
+    return json.loads(output.splitlines()[-1])
+
+
+def run(args):
+    names = args.scenarios or list(SCENARIOS)
+    results = {'version': RESULT_VERSION, 'frames': args.frames, 'seed': args.seed, 'scenarios': {}}
+    print('{:<14}{:>10}{:>10}{:>12}{:>9}{:>9}{:>9}{:>10}{:>9}'.format(
+        'scenario', 'median', 'p99', 'ticks/sec', 'enemies', 'proj', 'sparks', 'particles', 'rss MB'))
+    for name in names:
+        result = run_isolated(name, args)
+        results['scenarios'][name] = result
+        print('{:<14}{:>8.2f}ms{:>8.2f}ms{:>12.0f}{:>9}{:>9}{:>9}{:>10}{:>9.1f}'.format(
+            name, result['frame']['median_ms'], result['frame']['p99_ms'], result['ticks_per_sec'],
+            result['peak']['enemies'], result['peak']['projectiles'], result['peak']['sparks'],
+            result['peak']['particles'], result['peak_rss_kb'] / 1024))
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+        print('wrote ' + args.output)
+    return 0
+
+
+def metrics(result):
+    yield 'frame median', result['frame']['median_ms']
+    yield 'frame p99', result['frame']['p99_ms']
+    for stage, times in result['stages'].items():
+        yield stage + ' median', times['median_ms']
+        yield stage + ' p99', times['p99_ms']
+
+
+def compare(args):
+    with open(args.old) as f:
+        old = json.load(f)
+    with open(args.new) as f:
+        new = json.load(f)
+    regressions = 0
+    for name, result in new['scenarios'].items():
+        if name not in old['scenarios']:
+            print(name + ': no baseline')
+            continue
+        before = dict(metrics(old['scenarios'][name]))
+        for metric, value in metrics(result):
+            base = before.get(metric)
+            if base is None:
+                continue
+            if value > base * (1 + args.threshold) and value - base > args.min_ms:
+                regressions += 1
+                print('REGRESSION {:<14}{:<26}{:>9.3f} ms -> {:>9.3f} ms  (+{:.0%})'.format(
+                    name, metric, base, value, value / base - 1 if base else 1))
+        old_rss, new_rss = old['scenarios'][name]['peak_rss_kb'], result['peak_rss_kb']
+        if new_rss > old_rss * (1 + args.threshold):
+            regressions += 1
+            print('REGRESSION {:<14}{:<26}{:>9.1f} MB -> {:>9.1f} MB'.format(
+                name, 'peak rss', old_rss / 1024, new_rss / 1024))
+    print(str(regressions) + ' regression(s)')
+    return 1 if regressions else 0
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    run_parser = commands.add_parser('run')
+    run_parser.add_argument('scenarios', nargs='*', metavar='scenario')
+    run_parser.add_argument('--frames', type=int, default=1200)
+    run_parser.add_argument('--warmup', type=int, default=60)
+    run_parser.add_argument('--seed', type=int, default=1)
+    run_parser.add_argument('--output', metavar='JSON')
+
+    scenario_parser = commands.add_parser('scenario')
+    scenario_parser.add_argument('name', choices=list(SCENARIOS))
+    scenario_parser.add_argument('--frames', type=int, default=1200)
+    scenario_parser.add_argument('--warmup', type=int, default=60)
+    scenario_parser.add_argument('--seed', type=int, default=1)
+
+    compare_parser = commands.add_parser('compare')
+    compare_parser.add_argument('old')
+    compare_parser.add_argument('new')
+    compare_parser.add_argument('--threshold', type=float, default=0.1)
+    compare_parser.add_argument('--min-ms', type=float, default=0.02)
+
+    args = parser.parse_args()
+    if args.command == 'run':
+        unknown = [name for name in args.scenarios if name not in SCENARIOS]
+        if unknown:
+            parser.error('unknown scenario ' + ', '.join(unknown) + ', expected one of ' + ', '.join(SCENARIOS))
+        return run(args)
+    if args.command == 'scenario':
+        print(json.dumps(run_scenario(args.name, args.frames, args.warmup, args.seed)))
+        return 0
+    return compare(args)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
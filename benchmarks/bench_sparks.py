@@ -0,0 +1,91 @@
+import argparse
+import math
+import random
+
+import pygame
+
+from benchmarks.common import headless_display, frame_ms
+from scripts.spark import SparkSystem
+
+
+class LegacySpark:
+    def __init__(self, pos, angle, speed):
+        self.pos = list(pos)
+        self.angle = angle
+        self.speed = speed
+
+    def update(self):
+        self.pos[0] += math.cos(self.angle) * self.speed
+        self.pos[1] += math.sin(self.angle) * self.speed
+
+        self.speed = max(0, self.speed - 0.1)
+        return not self.speed
+
+    def render(self, surf, offset=(0, 0)):
+        render_points = [
+            (self.pos[0] + math.cos(self.angle) * self.speed * 3 - offset[0],
+             self.pos[1] + math.sin(self.angle) * self.speed * 3 - offset[1]),
+            (self.pos[0] + math.cos(self.angle + math.pi * 0.5) * self.speed * 0.5 - offset[0],
+             self.pos[1] + math.sin(self.angle + math.pi * 0.5) * self.speed * 0.5 - offset[1]),
+            (self.pos[0] + math.cos(self.angle + math.pi) * self.speed * 3 - offset[0],
+             self.pos[1] + math.sin(self.angle + math.pi) * self.speed * 3 - offset[1]),
+            (self.pos[0] + math.cos(self.angle - math.pi * 0.5) * self.speed * 0.5 - offset[0],
+             self.pos[1] + math.sin(self.angle - math.pi * 0.5) * self.speed * 0.5 - offset[1]),
+        ]
+
+        pygame.draw.polygon(surf, (255, 255, 255), render_points)
+
+
+def legacy_frame(sparks, surf):
+    for spark in sparks.copy():
+        kill = spark.update()
+        spark.render(surf)
+        if kill:
+            sparks.remove(spark)
+
+
+def spawn(count, seed=0):
+    rng = random.Random(seed)
+    return [((rng.random() * 320, rng.random() * 240), rng.random() * math.pi * 2, 2 + rng.random())
+            for _ in range(count)]
+
+
+def bench(count, frames, surf):
+    sparks = []
+    system = SparkSystem()
+
+    def refill():
+        for pos, angle, speed in spawn(count - len(sparks)):
+            sparks.append(LegacySpark(pos, angle, speed))
+        for pos, angle, speed in spawn(count - len(system)):
+            system.spawn(pos, angle, speed)
+
+    def legacy():
+        refill()
+        legacy_frame(sparks, surf)
+
+    def batched():
+        refill()
+        system.update()
+        system.render(surf)
+
+    legacy_ms = frame_ms(legacy, frames)
+    batched_ms = frame_ms(batched, frames)
+    print('  {:<12}{:>10.2f} ms -> {:>8.2f} ms  ({:.1f}x)'.format(str(count), legacy_ms, batched_ms,
+                                                               legacy_ms / batched_ms))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--counts', type=int, nargs='+', default=[1000, 10000])
+    parser.add_argument('--frames', type=int, default=30)
+    args = parser.parse_args()
+
+    surf = headless_display()
+    print('spark update + render per frame (kept topped up): Spark list -> SparkSystem')
+    for count in args.counts:
+        bench(count, args.frames, surf)
+
+
+if __name__ == '__main__':
+    main()
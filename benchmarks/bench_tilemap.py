@@ -0,0 +1,73 @@
+import argparse
+import pygame
+
+from benchmarks.common import load_map_data, synthetic_map_data, sample_positions, ns_per_call
+from scripts.tilemap import Tilemap, NEIGHBOR_OFFSETS, PHYSICS_TILES
+
+
+class LegacyTilemap:
+    def __init__(self, map_data):
+        self.tilemap = map_data['tilemap']
+        self.tile_size = map_data['tile_size']
+
+    def solid_check(self, pos):
+        tile_loc = str(int(pos[0] // self.tile_size)) + ';' + str(int(pos[1] // self.tile_size))
+        if tile_loc in self.tilemap:
+            if self.tilemap[tile_loc]['type'] in PHYSICS_TILES:
+                return self.tilemap[tile_loc]
+
+    def tiles_around(self, pos):
+        tiles = []
+        tile_loc = (int(pos[0] // self.tile_size), int(pos[1] // self.tile_size))
+        for offset in NEIGHBOR_OFFSETS:
+            check_loc = str(tile_loc[0] + offset[0]) + ';' + str(tile_loc[1] + offset[1])
+            if check_loc in self.tilemap:
+                tiles.append(self.tilemap[check_loc])
+        return tiles
+
+    def physics_rects_around(self, pos):
+        rects = []
+        for tile in self.tiles_around(pos):
+            if tile['type'] in PHYSICS_TILES:
+                rects.append(
+                    pygame.Rect(tile['pos'][0] * self.tile_size, tile['pos'][1] * self.tile_size, self.tile_size,
+                                self.tile_size))
+        return rects
+
+
+def chunked_tilemap(map_data):
+    tilemap = Tilemap(None, tile_size=map_data['tile_size'])
+    tilemap.load_map_data(map_data)
+    return tilemap
+
+
+def bench(name, map_data, samples):
+    positions = sample_positions(map_data, samples)
+    legacy = LegacyTilemap(map_data)
+    chunked = chunked_tilemap(map_data)
+
+    print(name + ' (' + str(len(map_data['tilemap'])) + ' tiles, ' + str(len(chunked.grid.chunks)) + ' chunks)')
+    for label, legacy_fn, chunked_fn in [
+        ('solid_check', legacy.solid_check, chunked.solid_check),
+        ('tiles_around', legacy.tiles_around, chunked.tiles_around),
+        ('physics_rects_around', legacy.physics_rects_around, chunked.physics_rects_around),
+    ]:
+        before = ns_per_call(legacy_fn, positions)
+        after = ns_per_call(chunked_fn, positions)
+        print('  {:<22}{:>10.0f} ns -> {:>6.0f} ns  ({:.2f}x)'.format(label, before, after, before / after))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--map', default='assets/maps/2.json')
+    parser.add_argument('--size', type=int, default=1000)
+    parser.add_argument('--samples', type=int, default=20000)
+    args = parser.parse_args()
+
+    bench(args.map, load_map_data(args.map), args.samples)
+    bench('synthetic ' + str(args.size) + 'x' + str(args.size), synthetic_map_data(args.size, args.size),
+          args.samples)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,78 @@
+import os
+import json
+import random
+import time
+
+
+def load_map_data(path):
+    f = open(path, 'r')
+    map_data = json.load(f)
+    f.close()
+    return map_data
+
+
+def synthetic_map_data(width, height, density=0.4, seed=0):
+    rng = random.Random(seed)
+    tilemap = {}
+    for x in range(width):
+        for y in range(height):
+            if rng.random() < density:
+                tilemap[str(x) + ';' + str(y)] = {'type': rng.choice(['grass', 'stone', 'decor']),
+                                                  'variant': rng.randint(0, 3), 'pos': [x, y]}
+    return {'tilemap': tilemap, 'tile_size': 16, 'offgrid': []}
+
+
+def sample_positions(map_data, count, seed=0):
+    rng = random.Random(seed)
+    tile_size = map_data['tile_size']
+    locs = [tile['pos'] for tile in map_data['tilemap'].values()]
+    return [((loc[0] + rng.random() * 2 - 0.5) * tile_size, (loc[1] + rng.random() * 2 - 0.5) * tile_size)
+            for loc in (rng.choice(locs) for _ in range(count))]
+
+
+def ns_per_call(fn, args_list, repeat=5):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter_ns()
+        for args in args_list:
+            fn(args)
+        elapsed = time.perf_counter_ns() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best / len(args_list)
+
+
+def headless_display():
+    os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+    import pygame
+    pygame.init()
+    pygame.display.set_mode((1, 1))
+    return pygame.Surface((320, 240), pygame.SRCALPHA)
+
+
+def frame_ms(fn, frames):
+    start = time.perf_counter()
+    for _ in range(frames):
+        fn()
+    return (time.perf_counter() - start) * 1000 / frames
+
+
+def tiled_map_data(map_data, repeat_x, repeat_y, gap=4):
+    locs = [tile['pos'] for tile in map_data['tilemap'].values()]
+    width = max(loc[0] for loc in locs) - min(loc[0] for loc in locs) + 1 + gap
+    height = max(loc[1] for loc in locs) - min(loc[1] for loc in locs) + 1 + gap
+    tile_size = map_data['tile_size']
+    tilemap = {}
+    offgrid = []
+    for i in range(repeat_x):
+        for j in range(repeat_y):
+            dx, dy = i * width, j * height
+            for tile in map_data['tilemap'].values():
+                pos = [tile['pos'][0] + dx, tile['pos'][1] + dy]
+                tilemap[str(pos[0]) + ';' + str(pos[1])] = {'type': tile['type'], 'variant': tile['variant'],
+                                                            'pos': pos}
+            for tile in map_data['offgrid']:
+                if tile['type'] == 'spawners' and tile['variant'] == 0 and (i or j):
+                    continue
+                offgrid.append({'type': tile['type'], 'variant': tile['variant'],
+                                'pos': [tile['pos'][0] + dx * tile_size, tile['pos'][1] + dy * tile_size]})
+    return {'tilemap': tilemap, 'tile_size': tile_size, 'offgrid': offgrid}
@@ -99,18 +99,11 @@ class Editor:
                     int((mpos[1] + self.scroll[1]) // self.tilemap.tile_size))
 
         if self.clicking and self.ongrid:
-            self.tilemap.tilemap[str(tile_pos[0]) + ';' + str(tile_pos[1])] = {
-                'type': self.tile_list[self.tile_group], 'variant': self.tile_variant, 'pos': tile_pos}
+            self.tilemap.set_tile(tile_pos, self.tile_list[self.tile_group], self.tile_variant)
         if self.right_clicking:
-            tile_loc = str(tile_pos[0]) + ';' + str(tile_pos[1])
-            if tile_loc in self.tilemap.tilemap:
-                del self.tilemap.tilemap[tile_loc]
-            for tile in self.tilemap.offgrid_tiles.copy():
-                tile_img = self.assets[tile['type']][tile['variant']]
-                tile_r = pygame.Rect(tile['pos'][0] - self.scroll[0], tile['pos'][1] - self.scroll[1],
-                                     tile_img.get_width(), tile_img.get_height())
-                if tile_r.collidepoint(mpos):
-                    self.tilemap.offgrid_tiles.remove(tile)
+            self.tilemap.remove_tile(tile_pos)
+            for tile in self.tilemap.offgrid_at((mpos[0] + self.scroll[0], mpos[1] + self.scroll[1])):
+                self.tilemap.remove_offgrid_tile(tile)
 
     def handle_events(self):
         for event in pygame.event.get():
@@ -136,7 +129,7 @@ class Editor:
         if event.button == 1:
             self.clicking = True
             if not self.ongrid:
-                self.tilemap.offgrid_tiles.append(
+                self.tilemap.add_offgrid_tile(
                     {'type': self.tile_list[self.tile_group], 'variant': self.tile_variant,
                      'pos': (mpos[0] + self.scroll[0], mpos[1] + self.scroll[1])})
         if event.button == 3:
@@ -172,7 +165,7 @@ class Editor:
         if event.key == pygame.K_g:
             self.ongrid = not self.ongrid
         if event.key == pygame.K_t:
-            self.tilemap.autotile()
+            self.tilemap.autotile(full=self.shift)
         if event.key == pygame.K_o:
             self.tilemap.save('map.json')
         if event.key == pygame.K_LSHIFT:
@@ -1,38 +1,84 @@
 import os
 import sys
+import time
+import argparse
 import math
 import random
 import pygame
-import time
 
-from scripts.utils import load_image, load_images, Animation
+from scripts.utils import load_image, load_images, load_sound, AnimationClip, SpriteCache
 from scripts.entities import Player, Enemy
 from scripts.tilemap import Tilemap
+from scripts.mapfile import BINARY_EXTENSION
+from scripts.levels import LevelCache, LevelPrefetcher, prepare_level
 from scripts.clouds import Clouds
-from scripts.particle import Particle
-from scripts.spark import Spark
+from scripts.particle import ParticleSystem
+from scripts.spark import SparkSystem
+from scripts.projectile import ProjectileSystem
+from scripts.pool import DEFAULT_POOL_SIZES
+from scripts.outline import SilhouetteRenderer
+from scripts.present import Presenter, PRESENT_MODES
+from scripts.hud import Hud, TextCache
+from scripts.camera import Camera
+from scripts.scheduler import FixedStepScheduler
+from scripts.inputs import ScriptedInput, patrol
+from scripts.replay import Recording, Recorder, replay
+from scripts.profiler import FrameProfiler, ProfilerOverlay
+
+LEVEL_CLEAR_STEPS = 45
 
 
 class Game:
-    def __init__(self):
+    def __init__(self, present_mode='scale', pool_sizes=None, interpolate=False, max_fps=60, headless=False,
+                 seed=None, level=0, profile=False):
+        self.present_mode = present_mode
+        self.interpolate = interpolate
+        self.max_fps = max_fps
+        self.headless = headless
+        self.seed = seed
+        self.recorder = None
+        self.profile = profile
+        self.profile_path = None
+        self.pool_sizes = dict(DEFAULT_POOL_SIZES, **(pool_sizes or {}))
+        if seed is not None:
+            random.seed(seed)
         self.initialize_pygame()
         self.setup_display()
         self.load_assets()
         self.load_sfx()
         self.initialize_game_objects()
+        self.level = min(level, self.level_count - 1)
         self.load_level(self.level)
 
     def initialize_pygame(self):
+        if self.headless:
+            os.environ['SDL_VIDEODRIVER'] = 'dummy'
+            os.environ['SDL_AUDIODRIVER'] = 'dummy'
         pygame.init()
         pygame.display.set_caption('PySlice')
 
     def setup_display(self):
-        self.screen = pygame.display.set_mode((640, 480))
+        if self.headless:
+            self.presenter = None
+            self.screen = pygame.display.set_mode((1, 1))
+        else:
+            self.presenter = Presenter((320, 240), (640, 480), mode=self.present_mode, overlay_rect=(0, 0, 320, 96))
+            self.screen = self.presenter.screen
         self.display = pygame.Surface((320, 240), pygame.SRCALPHA)
         self.display_2 = pygame.Surface((320, 240))
+        self.silhouette = SilhouetteRenderer(self.display.get_size())
+        self.camera = Camera(self.display.get_size())
         self.clock = pygame.time.Clock()
-        self.font = pygame.font.Font('assets/ARCADECLASSIC.TTF', 26)
+        self.scheduler = FixedStepScheduler()
+        self.render_rng = random.Random(self.seed)
+        self.hud_scale = self.presenter.overlay_scale if self.presenter else 1
+        self.font = pygame.font.Font('assets/ARCADECLASSIC.TTF', int(26 * self.hud_scale))
         self.movement = [False, False]
+        self.jump_pressed = False
+        self.dash_pressed = False
+        self.profiler = FrameProfiler(enabled=self.profile)
+        self.profiler_overlay = ProfilerOverlay(self.profiler, TextCache(pygame.font.Font(None, 12)),
+                                                presenter=self.presenter)
 
     def load_assets(self):
         self.assets = {
@@ -43,35 +89,46 @@ class Game:
             'player': load_image('entities/player.png'),
             'background': load_image('background.png'),
             'clouds': load_images('clouds'),
-            'enemy/idle': Animation(load_images('entities/enemy/idle'), img_dur=6),
-            'enemy/run': Animation(load_images('entities/enemy/run'), img_dur=4),
-            'player/idle': Animation(load_images('entities/player/idle'), img_dur=6),
-            'player/run': Animation(load_images('entities/player/run'), img_dur=4),
-            'player/jump': Animation(load_images('entities/player/jump')),
-            'player/slide': Animation(load_images('entities/player/slide')),
-            'player/wall_slide': Animation(load_images('entities/player/wall_slide')),
-            'particle/leaf': Animation(load_images('particles/leaf'), img_dur=20, loop=False),
-            'particle/particle': Animation(load_images('particles/particle'), img_dur=6, loop=False),
-            'particle/blood': Animation(load_images('particles/blood'), img_dur=1, loop=False),
-            'particle/coin': Animation(load_images('particles/coin'), img_dur=5, loop=True),
-            'ui/coin': Animation(load_images('ui/coin'), img_dur=5, loop=True),
+            'enemy/idle': AnimationClip(load_images('entities/enemy/idle'), img_dur=6),
+            'enemy/run': AnimationClip(load_images('entities/enemy/run'), img_dur=4),
+            'player/idle': AnimationClip(load_images('entities/player/idle'), img_dur=6),
+            'player/run': AnimationClip(load_images('entities/player/run'), img_dur=4),
+            'player/jump': AnimationClip(load_images('entities/player/jump')),
+            'player/slide': AnimationClip(load_images('entities/player/slide')),
+            'player/wall_slide': AnimationClip(load_images('entities/player/wall_slide')),
+            'particle/leaf': AnimationClip(load_images('particles/leaf'), img_dur=20, loop=False),
+            'particle/particle': AnimationClip(load_images('particles/particle'), img_dur=6, loop=False),
+            'particle/blood': AnimationClip(load_images('particles/blood'), img_dur=1, loop=False),
+            'particle/coin': AnimationClip(load_images('particles/coin'), img_dur=5, loop=True),
+            'ui/coin': AnimationClip(load_images('ui/coin'), img_dur=5, loop=True),
             'gun': load_image('gun.png'),
             'shotgun': load_image('shotgun.png'),
             'rifle': load_image('rifle.png'),
             'katana': load_image('katana.png'),
             'projectile': load_image('projectile.png'),
         }
+        self.sprites = SpriteCache()
+        self.warm_sprites()
+        self.hud = Hud(self.font, self.assets['ui/coin'], outline=max(1, int(2 * self.hud_scale)),
+                       scale=self.hud_scale)
+
+    def warm_sprites(self):
+        for key in ['enemy/idle', 'enemy/run', 'player/idle', 'player/run', 'player/jump', 'player/slide',
+                    'player/wall_slide', 'gun', 'shotgun', 'rifle']:
+            self.sprites.warm(self.assets[key], flip_x=True)
+        for flip_x in [False, True]:
+            self.sprites.warm(self.assets['katana'], flip_x=flip_x, rotation=-20)
 
     def load_sfx(self):
         self.sfx = {
-            'jump': pygame.mixer.Sound('assets/sfx/jump.wav'),
-            'dash': pygame.mixer.Sound('assets/sfx/dash.wav'),
-            'hit': pygame.mixer.Sound('assets/sfx/hit.wav'),
-            'shoot': pygame.mixer.Sound('assets/sfx/shoot.mp3'),
-            'shotgun': pygame.mixer.Sound('assets/sfx/shotgun.mp3'),
-            'rifle': pygame.mixer.Sound('assets/sfx/rifle.mp3'),
-            'coin': pygame.mixer.Sound('assets/sfx/coin.wav'),
-            'ambience': pygame.mixer.Sound('assets/sfx/ambience.wav'),
+            'jump': self.load_sound('assets/sfx/jump.wav'),
+            'dash': self.load_sound('assets/sfx/dash.wav'),
+            'hit': self.load_sound('assets/sfx/hit.wav'),
+            'shoot': self.load_sound('assets/sfx/shoot.mp3'),
+            'shotgun': self.load_sound('assets/sfx/shotgun.mp3'),
+            'rifle': self.load_sound('assets/sfx/rifle.mp3'),
+            'coin': self.load_sound('assets/sfx/coin.wav'),
+            'ambience': self.load_sound('assets/sfx/ambience.wav'),
         }
         self.sfx['ambience'].set_volume(0.2)
         self.sfx['shoot'].set_volume(0.4)
@@ -82,79 +139,216 @@ class Game:
         self.sfx['jump'].set_volume(0.7)
         self.sfx['coin'].set_volume(0.3)
 
+    def load_sound(self, path):
+        return load_sound(path, enabled=not self.headless)
+
     def initialize_game_objects(self):
         self.clouds = Clouds(self.assets['clouds'], count=16)
         self.player = Player(self, (50, 50), (8, 15))
         self.tilemap = Tilemap(self, tile_size=16)
+        self.level_cache = LevelCache(max_levels=4)
+        self.prefetcher = LevelPrefetcher(self.level_cache, lambda: Tilemap(self, tile_size=16), self.map_path)
+        self.level_count = self.count_levels()
         self.level = 0
         self.screenshake = 0
         self.coin_count = 0
-        self.projectiles = []
-        self.particles = []
-        self.sparks = []
+        self.projectiles = ProjectileSystem(self.assets['projectile'], capacity=self.pool_sizes['projectiles'])
+        self.particles = ParticleSystem(self.assets, capacity=self.pool_sizes['particles'])
+        self.sparks = SparkSystem(capacity=self.pool_sizes['sparks'])
+
+    def map_path(self, map_id):
+        path = 'assets/maps/' + str(map_id)
+        if os.path.exists(path + BINARY_EXTENSION):
+            return path + BINARY_EXTENSION
+        return path + '.json'
+
+    def pool_stats(self):
+        return {'particles': self.particles.stats(), 'sparks': self.sparks.stats(),
+                'projectiles': self.projectiles.stats()}
+
+    def count_levels(self):
+        return len({os.path.splitext(name)[0] for name in os.listdir('assets/maps')})
 
     def load_level(self, map_id):
-        self.tilemap.load('assets/maps/' + str(map_id) + '.json')
-        self.create_leaf_spawners()
-        self.spawn_entities()
-        self.scroll = [0, 0]
+        level = self.prefetcher.take(map_id)
+        if level is None:
+            level = prepare_level(self.tilemap, map_id, self.map_path(map_id))
+            self.level_cache.put(level)
+        else:
+            self.tilemap.restore(level.tilemap)
+        self.enter_level(level)
+        self.prefetcher.request(min(map_id + 1, self.level_count - 1))
+
+    def enter_level(self, level):
+        self.leaf_spawners = level.leaf_spawners
+        self.spawn_entities(level.spawners)
+        self.camera.reset()
+        self.prev_positions = {}
         self.dead = 0
         self.transition = -30
         self.level_transition_delay = 0
 
-    def create_leaf_spawners(self):
-        self.leaf_spawners = []
-        for tree in self.tilemap.extract([('large_decor', 2)], keep=True):
-            self.leaf_spawners.append(pygame.Rect(4 + tree['pos'][0], 4 + tree['pos'][1], 23, 13))
-
-    def spawn_entities(self):
+    def spawn_entities(self, spawners):
         self.enemies = []
-        for spawner in self.tilemap.extract([('spawners', 0), ('spawners', 1)]):
+        for spawner in spawners:
             if spawner['variant'] == 0:
-                self.player.pos = spawner['pos']
+                self.player.pos = list(spawner['pos'])
                 self.player.air_time = 0
             else:
                 self.enemies.append(Enemy(self, spawner['pos'], (8, 15)))
 
     def run(self):
-        pygame.mixer.music.load('assets/music.wav')
-        pygame.mixer.music.set_volume(0.5)
-        pygame.mixer.music.play(-1)
+        if pygame.mixer.get_init() and os.path.exists('assets/music.wav'):
+            pygame.mixer.music.load('assets/music.wav')
+            pygame.mixer.music.set_volume(0.5)
+            pygame.mixer.music.play(-1)
         self.sfx['ambience'].play(-1)
 
         while True:
-            self.clear_display()
-            self.handle_level_transition()
-            self.handle_player_death()
-            render_scroll = self.update_scroll()
-            self.spawn_leaf_particles()
-            self.clouds.update()
-            self.clouds.render(self.display_2, offset=render_scroll)
-            self.tilemap.render(self.display, offset=render_scroll)
-            self.update_and_render_enemies(render_scroll)
-            self.update_and_render_player(render_scroll)
-            self.update_and_render_projectiles(render_scroll)
-            self.update_and_render_sparks(render_scroll)
-            self.create_display_silhouette()
-            self.update_and_render_particles(render_scroll)
+            self.profiler.begin_frame()
             self.handle_events()
-            self.handle_level_transition_effect()
-            self.render_final_display()
-            self.clock.tick(60)
+            self.profiler.mark('events')
+            steps = self.scheduler.advance()
+            for _ in range(steps):
+                self.update()
+            if steps or self.interpolate:
+                self.render(self.scheduler.alpha() if self.interpolate else 1.0)
+                if self.scheduler.rendered():
+                    self.report_rates()
+            self.profiler.end_frame()
+            self.clock.tick(self.max_fps)
+
+    def simulate(self, frames, inputs=None, render=False):
+        start = time.perf_counter()
+        for _ in range(frames):
+            self.profiler.begin_frame()
+            if inputs:
+                inputs.poll(self)
+            self.update()
+            if render:
+                self.render()
+            self.profiler.end_frame()
+        elapsed = time.perf_counter() - start
+        return {'frames': frames, 'seconds': elapsed, 'ticks_per_sec': frames / elapsed if elapsed else 0.0}
+
+    def update(self):
+        profiler = self.profiler
+        profiler.skip()
+        if self.recorder:
+            self.recorder.record_input(self)
+        self.screenshake = max(0, self.screenshake - 1)
+        if self.interpolate:
+            self.prev_positions = self.entity_positions()
+        self.handle_level_transition()
+        self.handle_player_death()
+        self.handle_actions()
+        self.update_scroll()
+        profiler.mark('sim/level')
+        self.spawn_leaf_particles()
+        self.clouds.update()
+        profiler.mark('sim/clouds')
+        self.update_enemies()
+        profiler.mark('sim/enemies')
+        self.update_player()
+        profiler.mark('sim/player')
+        self.update_projectiles()
+        profiler.mark('sim/projectiles')
+        self.sparks.update()
+        profiler.mark('sim/sparks')
+        self.update_particles()
+        profiler.mark('sim/particles')
+        if self.recorder:
+            self.recorder.record_state(self)
+
+    def render(self, alpha=1.0):
+        profiler = self.profiler
+        profiler.skip()
+        render_scroll = self.camera.frame(alpha)
+        self.clear_display()
+        profiler.mark('draw/clear')
+        self.clouds.render(self.display_2, offset=render_scroll)
+        profiler.mark('draw/clouds')
+        self.render_tilemap(render_scroll)
+        profiler.mark('draw/tilemap')
+        self.render_enemies(render_scroll, alpha)
+        profiler.mark('draw/enemies')
+        self.render_player(render_scroll, alpha)
+        profiler.mark('draw/player')
+        self.render_projectiles(render_scroll)
+        profiler.mark('draw/projectiles')
+        self.render_sparks(render_scroll)
+        profiler.mark('draw/sparks')
+        self.create_display_silhouette()
+        profiler.mark('draw/silhouette')
+        self.render_particles(render_scroll)
+        profiler.mark('draw/particles')
+        self.handle_level_transition_effect()
+        profiler.mark('draw/transition')
+        self.render_final_display()
+        profiler.mark('draw/overlay')
+        self.present_display()
+        profiler.mark('draw/present')
+        self.render_stage_info()
+        profiler.mark('draw/hud')
+        self.flip_display()
+        profiler.mark('draw/flip')
+        self.count_objects()
+
+    def count_objects(self):
+        if self.profiler.enabled:
+            self.profiler.count('enemies', len(self.enemies))
+            self.profiler.count('projectiles', len(self.projectiles))
+            self.profiler.count('sparks', len(self.sparks))
+            self.profiler.count('particles', len(self.particles))
+
+    def toggle_profiler(self):
+        self.profiler_overlay.toggle()
+        self.profiler.enable_next_frame(self.profile or self.profiler_overlay.visible)
+
+    def start_recording(self, path):
+        if self.seed is None:
+            raise ValueError('recording needs a seeded game')
+        self.recorder = Recorder(Recording(self.seed, self.level), path)
+
+    def stop_recording(self):
+        if self.recorder:
+            self.recorder.save()
+            self.recorder = None
+
+    def quit(self):
+        self.stop_recording()
+        if self.profile_path:
+            self.profiler.export(self.profile_path)
+        pygame.quit()
+        sys.exit()
+
+    def report_rates(self):
+        pygame.display.set_caption('PySlice - sim ' + str(round(self.scheduler.sim_rate)) + ' / render '
+                                   + str(round(self.scheduler.render_rate)))
+
+    def entity_positions(self):
+        positions = {id(enemy): tuple(enemy.pos) for enemy in self.enemies}
+        positions[id(self.player)] = tuple(self.player.pos)
+        return positions
+
+    def entity_offset(self, entity, render_scroll, alpha):
+        prev = self.prev_positions.get(id(entity))
+        if prev is None or alpha >= 1:
+            return render_scroll
+        return (render_scroll[0] + (entity.pos[0] - prev[0]) * (1 - alpha),
+                render_scroll[1] + (entity.pos[1] - prev[1]) * (1 - alpha))
 
     def clear_display(self):
         self.display.fill((0, 0, 0, 0))
         self.display_2.blit(self.assets['background'], (0, 0))
-        self.screenshake = max(0, self.screenshake - 1)
 
     def handle_level_transition(self):
         if not len(self.enemies):
-            if self.level_transition_delay == 0:
-                self.level_transition_delay = pygame.time.get_ticks()
-            elif pygame.time.get_ticks() - self.level_transition_delay >= 750:
+            self.level_transition_delay += 1
+            if self.level_transition_delay > LEVEL_CLEAR_STEPS:
                 self.transition += 1
                 if self.transition > 30:
-                    self.level = min(self.level + 1, len(os.listdir('assets/maps')) - 1)
+                    self.level = min(self.level + 1, self.level_count - 1)
                     self.load_level(self.level)
                     self.level_transition_delay = 0
         if self.transition < 0:
@@ -168,160 +362,113 @@ class Game:
             if self.dead > 40:
                 self.load_level(self.level)
 
+    def handle_actions(self):
+        if self.jump_pressed and self.player.jump():
+            self.sfx['jump'].play()
+        if self.dash_pressed:
+            self.player.dash()
+        self.jump_pressed = False
+        self.dash_pressed = False
+
     def update_scroll(self):
-        self.scroll[0] += (self.player.rect().centerx - self.display.get_width() / 2 - self.scroll[0]) / 30
-        self.scroll[1] += (self.player.rect().centery - self.display.get_height() / 2 - self.scroll[1]) / 30
-        return int(self.scroll[0]), int(self.scroll[1])
+        self.camera.follow(self.player.rect())
 
     def spawn_leaf_particles(self):
         for rect in self.leaf_spawners:
             if random.random() * 49999 < rect.width * rect.height:
                 pos = (rect.x + random.random() * rect.width, rect.y + random.random() * rect.height)
-                self.particles.append(Particle(self, 'leaf', pos, velocity=[-0.1, 0.3],
-                                               frame=random.randint(0, 20)))
+                self.particles.spawn('leaf', pos, velocity=(-0.1, 0.3), frame=random.randint(0, 20))
+
+    def render_tilemap(self, render_scroll):
+        drawn = self.tilemap.render(self.display, offset=render_scroll)
+        self.camera.count('decor', drawn, len(self.tilemap.offgrid_tiles) - drawn)
 
-    def update_and_render_enemies(self, render_scroll):
+    def update_enemies(self):
         for enemy in self.enemies.copy():
-            kill = enemy.update(self.tilemap, (0, 0))
-            enemy.render(self.display, offset=render_scroll)
-            if kill:
+            if enemy.settled and not self.camera.awake(enemy.rect()):
+                enemy.sleep()
+                self.camera.sleeping += 1
+                continue
+            if enemy.update(self.tilemap, (0, 0)):
                 self.enemies.remove(enemy)
 
-    def update_and_render_player(self, render_scroll):
+    def render_enemies(self, render_scroll, alpha):
+        drawn = 0
+        for enemy in self.enemies:
+            if self.camera.visible(enemy.rect()):
+                enemy.render(self.display, offset=self.entity_offset(enemy, render_scroll, alpha))
+                drawn += 1
+        self.camera.count('enemies', drawn, len(self.enemies) - drawn)
+
+    def update_player(self):
         if not self.dead:
             self.player.update(self.tilemap, (self.movement[1] - self.movement[0], 0))
-            self.player.render(self.display, offset=render_scroll)
-
-    def update_and_render_projectiles(self, render_scroll):
-        for projectile in self.projectiles.copy():
-            self.update_projectile_delay(projectile)
-            self.handle_projectile_movement(projectile)
-
-            img = self.assets['projectile']
-            self.display.blit(img, (projectile[0][0] - img.get_width() / 2 - render_scroll[0],
-                                    projectile[0][1] - img.get_height() / 2 - render_scroll[1]))
-
-            if self.tilemap.solid_check(projectile[0]):
-                self.handle_projectile_collision(projectile)
-            elif projectile[2] > 360:
-                self.projectiles.remove(projectile)
-            elif abs(self.player.dashing) < 50 and self.player.rect().collidepoint(projectile[0]):
-                self.handle_player_hit(projectile)
-
-    def update_projectile_delay(self, projectile):
-        if projectile[2] > 0:
-            projectile[2] -= 1
-        if projectile[5] > 0:
-            projectile[5] -= 1
-        elif projectile[3] == 'rifle' and projectile[5] == 0:
-            self.sfx['rifle'].play()
-            projectile[5] = -1
-
-    def handle_projectile_movement(self, projectile):
-        weapon_type = projectile[3]
-
-        if projectile[4] == 0 or projectile[2] <= 0:
-            if weapon_type == 'gun':
-                projectile[0][0] += projectile[1][0] * 1.5
-            elif weapon_type == 'shotgun':
-                projectile[0][0] += projectile[1][0]
-                projectile[0][1] += projectile[1][1]
-            elif weapon_type == 'rifle':
-                projectile[0][0] += projectile[1][0] * 2.0
-                projectile[0][1] += projectile[1][1] * 1.0
 
-        projectile[2] += 1 if projectile[4] == 0 else 0
+    def render_player(self, render_scroll, alpha):
+        if not self.dead:
+            self.player.render(self.display, offset=self.entity_offset(self.player, render_scroll, alpha))
 
-    def handle_projectile_collision(self, projectile):
-        self.projectiles.remove(projectile)
+    def update_projectiles(self):
+        for _ in range(self.projectiles.update()):
+            self.sfx['rifle'].play()
+        target = self.player.rect() if abs(self.player.dashing) < 50 else None
+        tile_hits, player_hits = self.projectiles.collide(self.tilemap.collision, target)
+        for pos, velocity in tile_hits:
+            self.handle_projectile_collision(pos, velocity)
+        for _ in player_hits:
+            self.handle_player_hit()
+
+    def render_projectiles(self, render_scroll):
+        self.projectiles.render(self.display, offset=render_scroll, edges=self.camera.edges())
+        self.camera.count('projectiles', self.projectiles.drawn, self.projectiles.culled)
+
+    def handle_projectile_collision(self, pos, velocity):
         for _ in range(4):
-            self.sparks.append(Spark(projectile[0], random.random() - 0.5 + (math.pi if projectile[1][0] > 0 else 0),
-                                     2 + random.random()))
+            self.sparks.spawn(pos, random.random() - 0.5 + (math.pi if velocity[0] > 0 else 0), 2 + random.random())
 
-    def handle_player_hit(self, projectile):
-        self.projectiles.remove(projectile)
+    def handle_player_hit(self):
         self.dead += 1
         self.sfx['hit'].play()
         self.screenshake = max(16, self.screenshake)
-        self.particles.append(Particle(self, 'blood', self.player.rect().center))
+        center = self.player.rect().center
+        self.particles.spawn('blood', center)
         for _ in range(30):
             angle = random.random() * math.pi * 2
             speed = random.random() * 5
-            self.sparks.append(Spark(self.player.rect().center, angle, 2 + random.random()))
-            self.particles.append(Particle(self, 'particle', self.player.rect().center,
-                                           velocity=[math.cos(angle + math.pi) * speed * 0.5,
-                                                     math.sin(angle + math.pi) * speed * 0.5],
-                                           frame=random.randint(0, 7)))
-
-    def update_and_render_sparks(self, render_scroll):
-        for spark in self.sparks.copy():
-            kill = spark.update()
-            spark.render(self.display, offset=render_scroll)
-            if kill:
-                self.sparks.remove(spark)
+            self.sparks.spawn(center, angle, 2 + random.random())
+            self.particles.spawn('particle', center,
+                                 velocity=(math.cos(angle + math.pi) * speed * 0.5,
+                                           math.sin(angle + math.pi) * speed * 0.5),
+                                 frame=random.randint(0, 7))
+
+    def render_sparks(self, render_scroll):
+        self.sparks.render(self.display, offset=render_scroll, edges=self.camera.edges())
+        self.camera.count('sparks', self.sparks.drawn, self.sparks.culled)
 
     def create_display_silhouette(self):
-        display_mask = pygame.mask.from_surface(self.display)
-        display_silhouette = display_mask.to_surface(setcolor=(0, 0, 0, 180), unsetcolor=(0, 0, 0, 0))
-        shadow = display_mask.to_surface(setcolor=(0, 0, 0, 75), unsetcolor=(0, 0, 0, 0))
-
-        for offset in [(-1, 0), (1, 0), (0, -1), (0, 1)]:
-            self.display_2.blit(display_silhouette, offset)
-        self.display_2.blit(shadow, (4, 4))
-
-    def update_and_render_particles(self, render_scroll):
-        for particle in self.particles.copy():
-            kill = particle.update()
-            particle.render(self.display, offset=render_scroll)
-
-            if particle.type == 'leaf':
-                particle.pos[0] += math.sin(particle.animation.frame * 0.035) * 0.3
-            if particle.type == 'coin':
-                kill = self.update_coin_particle(particle)
-            if kill:
-                self.particles.remove(particle)
-                if particle.type == 'coin':
-                    self.coin_count += 1
-
-    def update_coin_particle(self, particle):
-        if not hasattr(particle, 'initialized'):
-            particle.initialized = True
-            particle.hover_start_time = None
-            particle.returning = False
-            particle.angle = random.uniform(0, 2 * math.pi)
-            particle.distance = 30
-            particle.hover_time = 0.3
-
-        if not particle.returning:
-            if not particle.hover_start_time:
-                particle.pos[0] += math.cos(particle.angle) * 5
-                particle.pos[1] += math.sin(particle.angle) * 5
-                if math.hypot(particle.pos[0] - self.player.pos[0],
-                              particle.pos[1] - self.player.pos[1]) >= particle.distance:
-                    particle.hover_start_time = time.time()
-            else:
-                if time.time() - particle.hover_start_time >= particle.hover_time:
-                    particle.returning = True
-        else:
-            direction = math.atan2(self.player.pos[1] - particle.pos[1], self.player.pos[0] - particle.pos[0])
-            particle.pos[0] += math.cos(direction) * 5
-            particle.pos[1] += math.sin(direction) * 5
-            if math.hypot(particle.pos[0] - self.player.pos[0], particle.pos[1] - self.player.pos[1]) <= 3:
-                self.sfx['coin'].play()
-                return True
+        self.silhouette.render(self.display, self.display_2)
+
+    def update_particles(self):
+        collected = self.particles.update(self.player.pos)
+        for _ in range(collected):
+            self.sfx['coin'].play()
+        self.coin_count += collected
+
+    def render_particles(self, render_scroll):
+        self.particles.render(self.display, offset=render_scroll, edges=self.camera.edges())
+        self.camera.count('particles', self.particles.drawn, self.particles.culled)
 
     def handle_events(self):
         for event in pygame.event.get():
             if event.type == pygame.QUIT:
-                pygame.quit()
-                sys.exit()
+                self.quit()
 
             if event.type == pygame.KEYDOWN:
                 self.handle_keydown(event)
 
             if event.type == pygame.MOUSEBUTTONDOWN:
                 if event.button == 1:
-                    self.player.dash()
+                    self.dash_pressed = True
 
             if event.type == pygame.KEYUP:
                 self.handle_keyup(event)
@@ -332,10 +479,11 @@ class Game:
         if event.key == pygame.K_RIGHT or event.key == pygame.K_d:
             self.movement[1] = True
         if event.key == pygame.K_UP or event.key == pygame.K_SPACE:
-            if self.player.jump():
-                self.sfx['jump'].play()
+            self.jump_pressed = True
         if event.key == pygame.K_x:
-            self.player.dash()
+            self.dash_pressed = True
+        if event.key == pygame.K_F3:
+            self.toggle_profiler()
 
     def handle_keyup(self, event):
         if event.key == pygame.K_LEFT or event.key == pygame.K_a:
@@ -353,61 +501,81 @@ class Game:
             self.display.blit(transition_surf, (0, 0))
 
     def render_stage_info(self):
-        stage_text = f"Stage  {self.level + 1}"
-        text_surface = self.font.render(stage_text, True, (255, 255, 255))
-
-        border_size = 2
-        x, y = 10, 10
-        border_positions = [
-            (x - border_size, y),
-            (x + border_size, y),
-            (x, y - border_size),
-            (x, y + border_size),
-            (x - border_size, y - border_size),
-            (x + border_size, y - border_size),
-            (x - border_size, y + border_size),
-            (x + border_size, y + border_size),
-        ]
-        for pos in border_positions:
-            border_surface = self.font.render(stage_text, True, (0, 0, 0))
-            self.screen.blit(border_surface, pos)
-
-        self.screen.blit(text_surface, (x, y))
-
-        self.assets['ui/coin'].update()
-        coin = self.assets['ui/coin'].img()
-        large_coin = pygame.transform.scale(coin, (int(coin.get_width() * 2.5), int(coin.get_height() * 2.5)))
-
-        coin_x, coin_y = x, y + text_surface.get_height() + 5
-        self.screen.blit(large_coin, (coin_x, coin_y))
-
-        coin_count_text = f"{self.coin_count}"
-        coin_count_surface = self.font.render(coin_count_text, True, (255, 223, 0))
-        coin_count_x = coin_x + large_coin.get_width() + 8
-        coin_count_y = coin_y + large_coin.get_height() - 22
-        coin_border_positions = [
-            (coin_count_x - border_size, coin_count_y),
-            (coin_count_x + border_size, coin_count_y),
-            (coin_count_x, coin_count_y - border_size),
-            (coin_count_x, coin_count_y + border_size),
-            (coin_count_x - border_size, coin_count_y - border_size),
-            (coin_count_x + border_size, coin_count_y - border_size),
-            (coin_count_x - border_size, coin_count_y + border_size),
-            (coin_count_x + border_size, coin_count_y + border_size),
-        ]
-        for pos in coin_border_positions:
-            coin_border_surface = self.font.render(coin_count_text, True, (0, 0, 0))
-            self.screen.blit(coin_border_surface, pos)
-
-        self.screen.blit(coin_count_surface, (coin_count_x, coin_count_y))
+        if self.presenter:
+            self.hud.render(self.presenter.screen, self.level, self.coin_count)
 
     def render_final_display(self):
         self.display_2.blit(self.display, (0, 0))
-        screenshake_offset = (random.random() * self.screenshake - self.screenshake / 2,
-                              random.random() * self.screenshake - self.screenshake / 2)
-        self.screen.blit(pygame.transform.scale(self.display_2, self.screen.get_size()), screenshake_offset)
-        self.render_stage_info()
-        pygame.display.update()
-
-
-Game().run()
+        if not self.headless:
+            self.profiler_overlay.render(self.display_2)
+
+    def present_display(self):
+        if self.headless:
+            return
+        screenshake_offset = (self.render_rng.random() * self.screenshake - self.screenshake / 2,
+                              self.render_rng.random() * self.screenshake - self.screenshake / 2)
+        self.presenter.present(self.display_2, screenshake_offset)
+
+    def flip_display(self):
+        if self.presenter:
+            self.presenter.flip()
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--headless', action='store_true')
+    parser.add_argument('--frames', type=int, default=3600)
+    parser.add_argument('--seed', type=int)
+    parser.add_argument('--level', type=int, default=0)
+    parser.add_argument('--render', action='store_true')
+    parser.add_argument('--interpolate', action='store_true')
+    parser.add_argument('--present', choices=PRESENT_MODES, default='scale')
+    parser.add_argument('--record', metavar='PATH')
+    parser.add_argument('--replay', metavar='PATH')
+    parser.add_argument('--timings', metavar='CSV')
+    parser.add_argument('--profile', metavar='CSV|JSON')
+    args = parser.parse_args(args)
+
+    if args.replay:
+        return replay_main(args)
+
+    seed = args.seed
+    if seed is None and args.record:
+        seed = random.randrange(2 ** 31)
+
+    if not args.headless:
+        game = Game(present_mode=args.present, interpolate=args.interpolate, seed=seed, level=args.level,
+                    profile=bool(args.profile))
+        game.profile_path = args.profile
+        if args.record:
+            game.start_recording(args.record)
+        game.run()
+        return 0
+
+    game = Game(headless=True, seed=seed, level=args.level, profile=bool(args.profile))
+    if args.record:
+        game.start_recording(args.record)
+    result = game.simulate(args.frames, ScriptedInput(patrol), render=args.render)
+    game.stop_recording()
+    if args.profile:
+        game.profiler.export(args.profile)
+    print('{frames} frames in {seconds:.2f} s  ({ticks_per_sec:.0f} ticks/sec)'.format(**result))
+    return 0
+
+
+def replay_main(args):
+    recording = Recording.load(args.replay)
+    game = Game(headless=True, seed=recording.seed, level=recording.level)
+    result = replay(game, recording, render=args.render)
+    if args.timings:
+        result.write_timings(args.timings)
+    print('{frames} frames  total {total_ms:.1f} ms  median {median_ms:.3f} ms  p99 {p99_ms:.3f} ms  '
+          'max {max_ms:.3f} ms'.format(**result.summary()))
+    for frame, expected, actual in result.mismatches:
+        print('checksum mismatch at frame ' + str(frame) + ': expected ' + format(expected, '08x') +
+              ', got ' + format(actual, '08x'))
+    return 0 if result.ok() else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,66 @@
+import pygame
+
+VIEW_MARGIN = 16
+SLEEP_MARGIN = 160
+FOLLOW_LAG = 30
+
+
+class Camera:
+    def __init__(self, size, margin=VIEW_MARGIN, sleep_margin=SLEEP_MARGIN, lag=FOLLOW_LAG):
+        self.size = size
+        self.margin = margin
+        self.sleep_margin = sleep_margin
+        self.lag = lag
+        self.scroll = [0.0, 0.0]
+        self.prev_scroll = (0.0, 0.0)
+        self.render_scroll = (0, 0)
+        self.view = pygame.Rect(0, 0, size[0], size[1])
+        self.bounds = self.view.inflate(margin * 2, margin * 2)
+        self.awake_bounds = [self.bounds, self.bounds]
+        self.counts = {}
+        self.sleeping = 0
+
+    def reset(self, scroll=(0, 0)):
+        self.scroll = [float(scroll[0]), float(scroll[1])]
+        self.prev_scroll = tuple(self.scroll)
+
+    def follow(self, target):
+        self.prev_scroll = tuple(self.scroll)
+        self.scroll[0] += (target.centerx - self.size[0] / 2 - self.scroll[0]) / self.lag
+        self.scroll[1] += (target.centery - self.size[1] / 2 - self.scroll[1]) / self.lag
+
+        view = pygame.Rect((int(self.scroll[0]), int(self.scroll[1])), self.size)
+        focus = pygame.Rect(0, 0, self.size[0], self.size[1])
+        focus.center = target.center
+        self.awake_bounds = [view.inflate(self.sleep_margin * 2, self.sleep_margin * 2),
+                             focus.inflate(self.sleep_margin * 2, self.sleep_margin * 2)]
+        self.sleeping = 0
+
+    def frame(self, alpha=1.0):
+        x = self.prev_scroll[0] + (self.scroll[0] - self.prev_scroll[0]) * alpha
+        y = self.prev_scroll[1] + (self.scroll[1] - self.prev_scroll[1]) * alpha
+        self.render_scroll = (int(x), int(y))
+
+        self.view = pygame.Rect(self.render_scroll, self.size)
+        self.bounds = self.view.inflate(self.margin * 2, self.margin * 2)
+        self.counts = {}
+        return self.render_scroll
+
+    def edges(self):
+        return self.bounds.left, self.bounds.top, self.bounds.right, self.bounds.bottom
+
+    def visible(self, rect):
+        return self.bounds.colliderect(rect)
+
+    def awake(self, rect):
+        return self.awake_bounds[0].colliderect(rect) or self.awake_bounds[1].colliderect(rect)
+
+    def count(self, category, drawn, culled):
+        counts = self.counts.setdefault(category, [0, 0])
+        counts[0] += drawn
+        counts[1] += culled
+
+    def stats(self):
+        stats = {category: {'drawn': drawn, 'culled': culled} for category, (drawn, culled) in self.counts.items()}
+        stats['sleeping'] = self.sleeping
+        return stats
@@ -0,0 +1,64 @@
+from collections import OrderedDict
+
+DEFAULT_MAX_BYTES = 32 * 1024 * 1024
+
+
+class ChunkSurfaceCache:
+    def __init__(self, max_bytes=DEFAULT_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key, revision, build):
+        entry = self.entries.get(key)
+        if entry is not None and entry[0] == revision:
+            self.hits += 1
+            self.entries.move_to_end(key)
+            return entry[1]
+
+        self.misses += 1
+        self.invalidate(key)
+        surf = build()
+        self.entries[key] = (revision, surf)
+        self.bytes += self.surface_bytes(surf)
+        self.evict()
+        return surf
+
+    def evict(self):
+        while self.bytes > self.max_bytes and len(self.entries) > 1:
+            _, (_, surf) = self.entries.popitem(last=False)
+            self.bytes -= self.surface_bytes(surf)
+            self.evictions += 1
+
+    def invalidate(self, key):
+        entry = self.entries.pop(key, None)
+        if entry is not None:
+            self.bytes -= self.surface_bytes(entry[1])
+
+    def clear(self):
+        self.entries.clear()
+        self.bytes = 0
+
+    def reset_stats(self):
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+            'chunks': len(self.entries),
+            'bytes': self.bytes,
+            'max_bytes': self.max_bytes,
+        }
+
+    @staticmethod
+    def surface_bytes(surf):
+        return surf.get_pitch() * surf.get_height()
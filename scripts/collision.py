@@ -0,0 +1,128 @@
+import numpy
+
+from scripts.tilegrid import CHUNK_SIZE, CHUNK_SHIFT, CHUNK_AREA
+
+NEIGHBOR_OFFSETS = [(-1, 0), (-1, -1), (0, -1), (1, -1), (1, 0), (0, 0), (-1, 1), (0, 1), (1, 1)]
+
+
+class CollisionLayer:
+    def __init__(self, grid, tile_size=16):
+        self.grid = grid
+        self.tile_size = tile_size
+        grid.on_fetch = self.fill_chunk
+        self.rebuild()
+
+    def rebuild(self, tile_size=None):
+        if tile_size:
+            self.tile_size = tile_size
+        keys = self.grid.chunk_keys()
+        if keys:
+            min_cx = min(key[0] for key in keys)
+            min_cy = min(key[1] for key in keys)
+            self.origin_x = min_cx * CHUNK_SIZE
+            self.origin_y = min_cy * CHUNK_SIZE
+            self.width = (max(key[0] for key in keys) - min_cx + 1) * CHUNK_SIZE
+            self.height = (max(key[1] for key in keys) - min_cy + 1) * CHUNK_SIZE
+        else:
+            self.origin_x = self.origin_y = self.width = self.height = 0
+
+        self.bits = bytearray(self.width * self.height)
+        for key, chunk in self.grid.chunks.items():
+            self.fill_chunk(key, chunk)
+
+    def fill_chunk(self, key, chunk):
+        flags = self.grid.solid_flags
+        types = chunk.types
+        i = key[0] * CHUNK_SIZE - self.origin_x
+        j = key[1] * CHUNK_SIZE - self.origin_y
+        if not (0 <= i < self.width and 0 <= j < self.height):
+            return
+        for row in range(0, CHUNK_AREA, CHUNK_SIZE):
+            base = (j + row // CHUNK_SIZE) * self.width + i
+            self.bits[base:base + CHUNK_SIZE] = bytes(flags[t] for t in types[row:row + CHUNK_SIZE])
+
+    def fetch(self, x, y):
+        key = (x >> CHUNK_SHIFT, y >> CHUNK_SHIFT)
+        if key in self.grid.pending:
+            self.grid.fetch(key)
+
+    def snapshot(self):
+        return self.tile_size, self.origin_x, self.origin_y, self.width, self.height, bytes(self.bits)
+
+    def restore(self, state):
+        self.tile_size, self.origin_x, self.origin_y, self.width, self.height, bits = state
+        self.bits = bytearray(bits)
+
+    def solid(self, x, y):
+        if self.grid.pending:
+            self.fetch(x, y)
+        i = x - self.origin_x
+        j = y - self.origin_y
+        if 0 <= i < self.width and 0 <= j < self.height:
+            return self.bits[j * self.width + i]
+        return 0
+
+    def solid_points(self, xs, ys):
+        tx = numpy.floor_divide(xs, self.tile_size).astype(numpy.int64) - self.origin_x
+        ty = numpy.floor_divide(ys, self.tile_size).astype(numpy.int64) - self.origin_y
+        inside = (tx >= 0) & (tx < self.width) & (ty >= 0) & (ty < self.height)
+        if self.grid.pending and inside.any():
+            keys = numpy.unique(numpy.stack([(tx[inside] + self.origin_x) >> CHUNK_SHIFT,
+                                             (ty[inside] + self.origin_y) >> CHUNK_SHIFT], axis=1), axis=0)
+            for cx, cy in keys.tolist():
+                self.fetch(cx << CHUNK_SHIFT, cy << CHUNK_SHIFT)
+        solid = numpy.zeros(len(tx), dtype=numpy.bool_)
+        bits = numpy.frombuffer(self.bits, dtype=numpy.uint8)
+        solid[inside] = bits[ty[inside] * self.width + tx[inside]] != 0
+        return solid
+
+    def update(self, x, y):
+        solid = 1 if self.grid.solid_at(x, y) else 0
+        i = x - self.origin_x
+        j = y - self.origin_y
+        if 0 <= i < self.width and 0 <= j < self.height:
+            self.bits[j * self.width + i] = solid
+        elif solid:
+            self.rebuild()
+
+    def resolve_horizontal(self, pos, size, dx):
+        ts = self.tile_size
+        tx = int(pos[0] // ts)
+        ty = int(pos[1] // ts)
+        ex = int(pos[0])
+        ey = int(pos[1])
+        hit = 0
+        for ox, oy in NEIGHBOR_OFFSETS:
+            if self.solid(tx + ox, ty + oy):
+                rx = (tx + ox) * ts
+                ry = (ty + oy) * ts
+                if ex < rx + ts and rx < ex + size[0] and ey < ry + ts and ry < ey + size[1]:
+                    if dx > 0:
+                        ex = rx - size[0]
+                        hit = 1
+                    if dx < 0:
+                        ex = rx + ts
+                        hit = -1
+                    pos[0] = ex
+        return hit
+
+    def resolve_vertical(self, pos, size, dy):
+        ts = self.tile_size
+        tx = int(pos[0] // ts)
+        ty = int(pos[1] // ts)
+        ex = int(pos[0])
+        ey = int(pos[1])
+        hit = 0
+        for ox, oy in NEIGHBOR_OFFSETS:
+            if self.solid(tx + ox, ty + oy):
+                rx = (tx + ox) * ts
+                ry = (ty + oy) * ts
+                if ex < rx + ts and rx < ex + size[0] and ey < ry + ts and ry < ey + size[1]:
+                    if dy > 0:
+                        ey = ry - size[1]
+                        hit = 1
+                    if dy < 0:
+                        ey = ry + ts
+                        hit = -1
+                    pos[1] = ey
+        return hit
@@ -2,11 +2,16 @@ import math
 import random
 import pygame
 
-from scripts.particle import Particle
-from scripts.spark import Spark
+from scripts.projectile import Weapon
+
+WALK_CHANCE = 0.01
+REST_HISTORY = 8
 
 
 class PhysicsEntity:
+    __slots__ = ('game', 'type', 'pos', 'size', 'velocity', 'collide_up', 'collide_down', 'collide_left',
+                 'collide_right', 'action', 'clip', 'anim_frame', 'anim_offset', 'flip', 'last_movement', 'cached_rect')
+
     def __init__(self, game, e_type, pos, size):
         self.initialize_entity(game, e_type, pos, size)
         self.set_action('idle')
@@ -17,27 +22,36 @@ class PhysicsEntity:
         self.pos = list(pos)
         self.size = size
         self.velocity = [0.0, 0.0]
-        self.collisions = {'up': False, 'down': False, 'right': False, 'left': False}
+        self.reset_collisions()
         self.action = ''
         self.anim_offset = (-3, -3)
         self.flip = False
         self.last_movement = [0, 0]
+        self.cached_rect = pygame.Rect(self.pos, size)
 
     def rect(self):
-        return pygame.Rect(self.pos[0], self.pos[1], self.size[0], self.size[1])
+        self.cached_rect.update(self.pos, self.size)
+        return self.cached_rect
+
+    def reset_collisions(self):
+        self.collide_up = False
+        self.collide_down = False
+        self.collide_left = False
+        self.collide_right = False
 
     def set_action(self, action):
         if action != self.action:
             self.action = action
-            self.animation = self.game.assets[self.type + '/' + self.action].copy()
+            self.clip = self.game.assets[self.type + '/' + self.action]
+            self.anim_frame = 0
 
     def update(self, tilemap, movement=(0, 0)):
         self.handle_collisions(tilemap, movement)
         self.apply_gravity()
-        self.animation.update()
+        self.anim_frame = self.clip.next_frame(self.anim_frame)
 
     def handle_collisions(self, tilemap, movement):
-        self.collisions = {'up': False, 'down': False, 'right': False, 'left': False}
+        self.reset_collisions()
         frame_movement = (movement[0] + self.velocity[0], movement[1] + self.velocity[1])
         self.pos[0] += frame_movement[0]
         self.check_horizontal_collisions(tilemap, frame_movement)
@@ -47,28 +61,18 @@ class PhysicsEntity:
         self.last_movement = movement
 
     def check_horizontal_collisions(self, tilemap, frame_movement):
-        entity_rect = self.rect()
-        for rect in tilemap.physics_rects_around(self.pos):
-            if entity_rect.colliderect(rect):
-                if frame_movement[0] > 0:
-                    entity_rect.right = rect.left
-                    self.collisions['right'] = True
-                if frame_movement[0] < 0:
-                    entity_rect.left = rect.right
-                    self.collisions['left'] = True
-                self.pos[0] = entity_rect.x
+        hit = tilemap.collision.resolve_horizontal(self.pos, self.size, frame_movement[0])
+        if hit > 0:
+            self.collide_right = True
+        elif hit < 0:
+            self.collide_left = True
 
     def check_vertical_collisions(self, tilemap, frame_movement):
-        entity_rect = self.rect()
-        for rect in tilemap.physics_rects_around(self.pos):
-            if entity_rect.colliderect(rect):
-                if frame_movement[1] > 0:
-                    entity_rect.bottom = rect.top
-                    self.collisions['down'] = True
-                if frame_movement[1] < 0:
-                    entity_rect.top = rect.bottom
-                    self.collisions['up'] = True
-                self.pos[1] = entity_rect.y
+        hit = tilemap.collision.resolve_vertical(self.pos, self.size, frame_movement[1])
+        if hit > 0:
+            self.collide_down = True
+        elif hit < 0:
+            self.collide_up = True
 
     def update_flip_state(self, movement):
         if movement[0] > 0:
@@ -78,30 +82,73 @@ class PhysicsEntity:
 
     def apply_gravity(self):
         self.velocity[1] = min(5.0, self.velocity[1] + 0.2)
-        if self.collisions['down'] or self.collisions['up']:
+        if self.collide_down or self.collide_up:
             self.velocity[1] = 0
 
     def render(self, surf, offset=(0, 0)):
-        surf.blit(pygame.transform.flip(self.animation.img(), self.flip, False),
+        surf.blit(self.game.sprites.get(self.clip.frames[self.anim_frame], self.flip),
                   (self.pos[0] - offset[0] + self.anim_offset[0], self.pos[1] - offset[1] + self.anim_offset[1]))
 
 
 class Enemy(PhysicsEntity):
+    __slots__ = ('walking', 'weapon', 'settled', 'rest_cycle', 'rest_phase')
+
     def __init__(self, game, pos, size):
         super().__init__(game, 'enemy', pos, size)
         self.walking = 0
         self.weapon = random.choice(['gun', 'rifle', 'shotgun'])
+        self.settled = False
+        self.rest_cycle = []
+        self.rest_phase = 0
 
     def update(self, tilemap, movement=(0, 0)):
         movement = self.update_behavior(tilemap, movement)
         super().update(tilemap, movement)
         self.update_action(movement)
+        self.track_rest()
         return self.handle_collision_with_player()
 
+    def rest_state(self):
+        # ints and floats compare equal but print differently in replay checksums, so types are part of the state
+        pos, velocity = self.pos, self.velocity
+        return (pos[0], pos[1], velocity[0], velocity[1], self.collide_up, self.collide_down, self.collide_left,
+                self.collide_right, type(pos[0]), type(pos[1]), type(velocity[0]), type(velocity[1]))
+
+    def track_rest(self):
+        if self.walking:
+            self.settled = False
+            self.rest_cycle = []
+            return
+        state = self.rest_state()
+        if state in self.rest_cycle:
+            if not self.settled:
+                self.rest_cycle = self.rest_cycle[self.rest_cycle.index(state):]
+            self.rest_phase = self.rest_cycle.index(state)
+            self.settled = True
+        else:
+            if self.settled:
+                self.rest_cycle = []
+            self.settled = False
+            self.rest_cycle.append(state)
+            if len(self.rest_cycle) > REST_HISTORY:
+                self.rest_cycle.pop(0)
+
+    def sleep(self):
+        if random.random() < WALK_CHANCE:
+            self.walking = random.randint(30, 120)
+        self.rest_phase = (self.rest_phase + 1) % len(self.rest_cycle)
+        state = self.rest_cycle[self.rest_phase]
+        self.pos[0], self.pos[1], self.velocity[0], self.velocity[1] = state[:4]
+        self.collide_up, self.collide_down, self.collide_left, self.collide_right = state[4:8]
+        self.anim_frame = self.clip.next_frame(self.anim_frame)
+        if self.walking:
+            self.settled = False
+            self.rest_cycle = []
+
     def update_behavior(self, tilemap, movement):
         if self.walking:
             if tilemap.solid_check((self.rect().centerx + (-7 if self.flip else 7), self.pos[1] + 23)):
-                if self.collisions['right'] or self.collisions['left']:
+                if self.collide_right or self.collide_left:
                     self.flip = not self.flip
                 else:
                     movement = (movement[0] - 0.5 if self.flip else 0.5, movement[1])
@@ -109,7 +156,7 @@ class Enemy(PhysicsEntity):
                 self.flip = not self.flip
             self.walking = max(0, self.walking - 1)
             self.shoot_projectile()
-        elif random.random() < 0.01:
+        elif random.random() < WALK_CHANCE:
             self.walking = random.randint(30, 120)
         return movement
 
@@ -123,65 +170,45 @@ class Enemy(PhysicsEntity):
         if abs(dis[1]) >= 16:
             return
 
-        projectiles_to_add = self.create_projectiles(dis)
-
-        for projectile in projectiles_to_add:
-            self.game.projectiles.append(projectile)
-            self.add_sparks(projectile[0])
+        for pos in self.create_projectiles(dis):
+            self.add_sparks(pos)
 
     def create_projectiles(self, dis):
-        projectiles_to_add = []
         if self.flip and dis[0] < 0:
-            if self.weapon == 'gun':
-                self.game.sfx['shoot'].play()
-                projectiles_to_add.append([[self.rect().centerx - 7, self.rect().centery],
-                                           [-1.5, 0], 0, 'gun', 0, 0])
-            elif self.weapon == 'shotgun':
-                self.game.sfx['shotgun'].play()
-                projectiles_to_add.extend(self.create_shotgun_projectiles(-1.5))
-            elif self.weapon == 'rifle':
-                projectiles_to_add.extend(self.create_rifle_projectiles(-1.5))
+            x_velocity = -1.5
         elif not self.flip and dis[0] > 0:
-            if self.weapon == 'gun':
-                self.game.sfx['shoot'].play()
-                projectiles_to_add.append([[self.rect().centerx + 7, self.rect().centery],
-                                           [1.5, 0], 0, 'gun', 0, 0])
-            elif self.weapon == 'shotgun':
-                self.game.sfx['shotgun'].play()
-                projectiles_to_add.extend(self.create_shotgun_projectiles(1.5))
-            elif self.weapon == 'rifle':
-                projectiles_to_add.extend(self.create_rifle_projectiles(1.5))
-        return projectiles_to_add
+            x_velocity = 1.5
+        else:
+            return []
+
+        if self.weapon == 'gun':
+            self.game.sfx['shoot'].play()
+            return [self.fire(Weapon.GUN, 7, (x_velocity, 0))]
+        elif self.weapon == 'shotgun':
+            self.game.sfx['shotgun'].play()
+            return self.create_shotgun_projectiles(x_velocity)
+        elif self.weapon == 'rifle':
+            return self.create_rifle_projectiles(x_velocity)
+        return []
+
+    def fire(self, weapon, distance, velocity, timer=0, held=False, delay=0):
+        rect = self.rect()
+        pos = (rect.centerx - distance if self.flip else rect.centerx + distance, rect.centery)
+        self.game.projectiles.spawn(pos, velocity, weapon, timer=timer, held=held, delay=delay)
+        return pos
 
     def create_shotgun_projectiles(self, x_velocity):
-        if self.flip:
-            return [[[self.rect().centerx - 20, self.rect().centery],
-                     [x_velocity * random.uniform(1.2, 1.5), spread], 0, 'shotgun', 0, 0]
-                    for spread in [-0.15, -0.075, 0, 0.075, 0.15]]
-        else:
-            return [[[self.rect().centerx + 20, self.rect().centery],
-                     [x_velocity * random.uniform(1.2, 1.5), spread], 0, 'shotgun', 0, 0]
-                    for spread in [-0.15, -0.075, 0, 0.075, 0.15]]
+        return [self.fire(Weapon.SHOTGUN, 20, (x_velocity * random.uniform(1.2, 1.5), spread))
+                for spread in [-0.15, -0.075, 0, 0.075, 0.15]]
 
     def create_rifle_projectiles(self, x_velocity):
-        projectiles = []
-        for i in range(3):
-            angle_offset = random.uniform(-0.2, 0.2)
-            if self.flip:
-                projectiles.append(
-                    [[self.rect().centerx - 20, self.rect().centery],
-                     [x_velocity, angle_offset], i * 10, 'rifle', 1, i * 5])
-            else:
-                projectiles.append(
-                    [[self.rect().centerx + 20, self.rect().centery],
-                     [x_velocity, angle_offset], i * 10, 'rifle', 1,
-                     i * 5])
-        return projectiles
+        return [self.fire(Weapon.RIFLE, 20, (x_velocity, random.uniform(-0.2, 0.2)), timer=i * 10, held=True,
+                          delay=i * 5)
+                for i in range(3)]
 
     def add_sparks(self, position):
         for _ in range(4):
-            self.game.sparks.append(
-                Spark(position, random.random() - 0.5 + (math.pi if self.flip else 0), 2 + random.random()))
+            self.game.sparks.spawn(position, random.random() - 0.5 + (math.pi if self.flip else 0), 2 + random.random())
 
     def update_action(self, movement):
         if movement[0] != 0:
@@ -191,62 +218,54 @@ class Enemy(PhysicsEntity):
 
     def handle_collision_with_player(self):
         if abs(self.game.player.dashing) >= 50:
-            if self.rect().colliderect(self.game.player.rect()):
+            rect = self.rect()
+            if rect.colliderect(self.game.player.rect()):
                 self.game.screenshake = max(16, self.game.screenshake)
                 self.game.sfx['hit'].play()
-                self.game.particles.append(Particle(self.game, 'blood', self.rect().center))
-                self.create_collision_effects()
+                self.game.particles.spawn('blood', rect.center)
+                self.create_collision_effects(rect.center)
 
                 for i in range(1):
-                    self.game.particles.append(Particle(self.game, 'coin', self.rect().center))
+                    self.game.particles.spawn('coin', rect.center)
                 return True
         return False
 
-    def create_collision_effects(self):
+    def create_collision_effects(self, center):
         for i in range(30):
             angle = random.random() * math.pi * 2
             speed = random.random() * 5
-            self.game.sparks.append(Spark(self.rect().center, angle, 2 + random.random()))
-            self.game.particles.append(Particle(self.game, 'particle', self.rect().center,
-                                                velocity=[math.cos(angle + math.pi) * speed * 0.5,
-                                                          math.sin(angle + math.pi) * speed * 0.5],
-                                                frame=random.randint(0, 7)))
-        self.game.sparks.append(Spark(self.rect().center, 0, 5 + random.random()))
-        self.game.sparks.append(Spark(self.rect().center, math.pi, 5 + random.random()))
+            self.game.sparks.spawn(center, angle, 2 + random.random())
+            self.game.particles.spawn('particle', center,
+                                      velocity=(math.cos(angle + math.pi) * speed * 0.5,
+                                                math.sin(angle + math.pi) * speed * 0.5),
+                                      frame=random.randint(0, 7))
+        self.game.sparks.spawn(center, 0, 5 + random.random())
+        self.game.sparks.spawn(center, math.pi, 5 + random.random())
 
     def render(self, surf, offset=(0, 0)):
         super().render(surf, offset=offset)
         self.render_gun(surf, offset)
 
     def render_gun(self, surf, offset):
+        center_x, center_y = self.rect().center
+        weapon = self.game.assets[self.weapon]
         if self.weapon == 'gun':
             if self.flip:
-                surf.blit(pygame.transform.flip(self.game.assets['gun'], True, False),
-                          (self.rect().centerx - 4 - self.game.assets['gun'].get_width() - offset[0],
-                           self.rect().centery - offset[1]))
+                surf.blit(self.game.sprites.get(weapon, True),
+                          (center_x - 4 - weapon.get_width() - offset[0], center_y - offset[1]))
             else:
-                surf.blit(self.game.assets['gun'], (self.rect().centerx + 4 - offset[0],
-                                                    self.rect().centery - offset[1]))
-        elif self.weapon == 'shotgun':
+                surf.blit(weapon, (center_x + 4 - offset[0], center_y - offset[1]))
+        elif self.weapon in {'shotgun', 'rifle'}:
             if self.flip:
-                surf.blit(pygame.transform.flip(self.game.assets['shotgun'], True, False),
-                          (self.rect().centerx + 2 - self.game.assets['shotgun'].get_width() - offset[0],
-                           self.rect().centery - 5 - offset[1]))
+                surf.blit(self.game.sprites.get(weapon, True),
+                          (center_x + 2 - weapon.get_width() - offset[0], center_y - 5 - offset[1]))
             else:
-                surf.blit(self.game.assets['shotgun'], (self.rect().centerx - 2 - offset[0],
-                                                        self.rect().centery - 5 - offset[1]))
-
-        elif self.weapon == 'rifle':
-            if self.flip:
-                surf.blit(pygame.transform.flip(self.game.assets['rifle'], True, False),
-                          (self.rect().centerx + 2 - self.game.assets['rifle'].get_width() - offset[0],
-                           self.rect().centery - 5 - offset[1]))
-            else:
-                surf.blit(self.game.assets['rifle'], (self.rect().centerx - 2 - offset[0],
-                                                      self.rect().centery - 5 - offset[1]))
+                surf.blit(weapon, (center_x - 2 - offset[0], center_y - 5 - offset[1]))
 
 
 class Player(PhysicsEntity):
+    __slots__ = ('air_time', 'jumps', 'wall_slide', 'dashing', 'speed')
+
     def __init__(self, game, pos, size):
         super().__init__(game, 'player', pos, size)
         self.initialize_player()
@@ -276,16 +295,16 @@ class Player(PhysicsEntity):
             self.game.dead += 1
 
     def handle_landing(self):
-        if self.collisions['down']:
+        if self.collide_down:
             self.air_time = 0
             self.jumps = 1
 
     def handle_wall_slide(self):
         self.wall_slide = False
-        if (self.collisions['right'] or self.collisions['left']) and self.air_time > 4:
+        if (self.collide_right or self.collide_left) and self.air_time > 4:
             self.wall_slide = True
             self.velocity[1] = min(self.velocity[1], 0.5)
-            self.flip = not self.collisions['right']
+            self.flip = not self.collide_right
             self.set_action('wall_slide')
 
     def update_action(self):
@@ -303,9 +322,8 @@ class Player(PhysicsEntity):
                 angle = random.random() * math.pi * 2
                 speed = random.random() * 0.5 + 0.5
                 pvelocity = [math.cos(angle) * speed, math.sin(angle) * speed]
-                self.game.particles.append(
-                    Particle(self.game, 'particle', self.rect().center, velocity=pvelocity,
-                             frame=random.randint(0, 7)))
+                self.game.particles.spawn('particle', self.rect().center, velocity=pvelocity,
+                                          frame=random.randint(0, 7))
 
         self.update_dash_state()
 
@@ -316,8 +334,8 @@ class Player(PhysicsEntity):
                 self.velocity[0] *= 0.1
 
             pvelocity = [abs(self.dashing) / self.dashing * random.random() * 3, 0]
-            self.game.particles.append(Particle(self.game, 'particle', self.rect().center, velocity=pvelocity,
-                                                frame=random.randint(0, 7)))
+            self.game.particles.spawn('particle', self.rect().center, velocity=pvelocity,
+                                      frame=random.randint(0, 7))
 
     def update_dash_state(self):
         if self.dashing > 0:
@@ -337,15 +355,13 @@ class Player(PhysicsEntity):
             self.render_katana(surf, offset)
 
     def render_katana(self, surf, offset):
-        katana_image = pygame.transform.rotate(self.game.assets['katana'], -20)
+        katana_image = self.game.sprites.get(self.game.assets['katana'], self.flip, -20)
 
+        center_x, center_y = self.rect().center
         if self.flip:
-            katana_image = pygame.transform.flip(katana_image, True, False)
-            surf.blit(katana_image,
-                      (self.rect().centerx - katana_image.get_width() + 8 - offset[0],
-                       self.rect().centery - 20 - offset[1]))
+            surf.blit(katana_image, (center_x - katana_image.get_width() + 8 - offset[0], center_y - 20 - offset[1]))
         else:
-            surf.blit(katana_image, (self.rect().centerx - 8 - offset[0], self.rect().centery - 20 - offset[1]))
+            surf.blit(katana_image, (center_x - 8 - offset[0], center_y - 20 - offset[1]))
 
     def jump(self):
         if self.wall_slide:
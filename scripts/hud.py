@@ -0,0 +1,64 @@
+from collections import OrderedDict
+
+import pygame
+
+from scripts.utils import AnimationClip
+
+OUTLINE_OFFSETS = [(-1, 0), (1, 0), (0, -1), (0, 1), (-1, -1), (1, -1), (-1, 1), (1, 1)]
+STAGE_COLOR = (255, 255, 255)
+COIN_COLOR = (255, 223, 0)
+COIN_SCALE = 2.5
+
+
+class TextCache:
+    def __init__(self, font, max_entries=64):
+        self.font = font
+        self.max_entries = max_entries
+        self.labels = OrderedDict()
+
+    def render(self, text, color, outline=2, outline_color=(0, 0, 0)):
+        key = (text, color, outline, outline_color)
+        label = self.labels.get(key)
+        if label is not None:
+            self.labels.move_to_end(key)
+            return label
+
+        fill = self.font.render(text, True, color)
+        border = self.font.render(text, True, outline_color)
+        label = pygame.Surface((fill.get_width() + outline * 2, fill.get_height() + outline * 2), pygame.SRCALPHA)
+        for offset in OUTLINE_OFFSETS:
+            label.blit(border, (outline + offset[0] * outline, outline + offset[1] * outline))
+        label.blit(fill, (outline, outline))
+
+        self.labels[key] = label
+        while len(self.labels) > self.max_entries:
+            self.labels.popitem(last=False)
+        return label
+
+
+def scale_clip(clip, factor):
+    images = [pygame.transform.scale(img, (int(img.get_width() * factor), int(img.get_height() * factor)))
+              for img in clip.images]
+    return AnimationClip(images, img_dur=clip.img_duration, loop=clip.loop)
+
+
+class Hud:
+    def __init__(self, font, coin_clip, outline=2, scale=1):
+        self.text = TextCache(font)
+        self.outline = outline
+        self.scale = scale
+        self.coin = scale_clip(coin_clip, COIN_SCALE * scale).play()
+
+    def render(self, surf, level, coin_count):
+        x = y = int(10 * self.scale)
+        stage_label = self.text.render(f"Stage  {level + 1}", STAGE_COLOR, self.outline)
+        surf.blit(stage_label, (x - self.outline, y - self.outline))
+
+        self.coin.update()
+        coin = self.coin.img()
+        coin_x, coin_y = x, y + stage_label.get_height() - self.outline * 2 + int(5 * self.scale)
+        surf.blit(coin, (coin_x, coin_y))
+
+        coin_label = self.text.render(f"{coin_count}", COIN_COLOR, self.outline)
+        surf.blit(coin_label, (coin_x + coin.get_width() + int(8 * self.scale) - self.outline,
+                               coin_y + coin.get_height() - int(22 * self.scale) - self.outline))
@@ -0,0 +1,27 @@
+NEUTRAL = (False, False, False, False)
+
+
+def patrol(frame):
+    return (frame // 37) % 3 == 0, (frame // 53) % 2 == 0, frame % 41 == 0, frame % 97 == 0
+
+
+class ScriptedInput:
+    def __init__(self, script):
+        self.script = script
+        self.frame = 0
+
+    def next(self):
+        if callable(self.script):
+            state = self.script(self.frame)
+        elif self.frame < len(self.script):
+            state = self.script[self.frame]
+        else:
+            state = NEUTRAL
+        self.frame += 1
+        return state
+
+    def poll(self, game):
+        left, right, jump, dash = self.next()
+        game.movement = [left, right]
+        game.jump_pressed = game.jump_pressed or jump
+        game.dash_pressed = game.dash_pressed or dash
@@ -0,0 +1,104 @@
+import threading
+from collections import OrderedDict
+
+import pygame
+
+LEAF_SPAWNER_IDS = [('large_decor', 2)]
+SPAWNER_IDS = [('spawners', 0), ('spawners', 1)]
+
+
+class LevelState:
+    def __init__(self, map_id, tilemap, leaf_spawners, spawners):
+        self.map_id = map_id
+        self.tilemap = tilemap
+        self.leaf_spawners = leaf_spawners
+        self.spawners = spawners
+
+    def close(self):
+        self.tilemap.close()
+
+
+def prepare_level(tilemap, map_id, path):
+    tilemap.load(path)
+    leaf_spawners = [pygame.Rect(4 + tree['pos'][0], 4 + tree['pos'][1], 23, 13)
+                     for tree in tilemap.extract(LEAF_SPAWNER_IDS, keep=True)]
+    spawners = tilemap.extract(SPAWNER_IDS)
+    return LevelState(map_id, tilemap.snapshot(), leaf_spawners, spawners)
+
+
+class LevelCache:
+    def __init__(self, max_levels=4):
+        self.max_levels = max_levels
+        self.levels = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def __contains__(self, map_id):
+        with self.lock:
+            return map_id in self.levels
+
+    def get(self, map_id):
+        with self.lock:
+            level = self.levels.get(map_id)
+            if level is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self.levels.move_to_end(map_id)
+            return level
+
+    def put(self, level):
+        with self.lock:
+            replaced = self.levels.get(level.map_id)
+            if replaced is not None and replaced is not level:
+                replaced.close()
+            self.levels[level.map_id] = level
+            self.levels.move_to_end(level.map_id)
+            while len(self.levels) > self.max_levels:
+                self.levels.popitem(last=False)[1].close()
+
+    def clear(self):
+        with self.lock:
+            for level in self.levels.values():
+                level.close()
+            self.levels.clear()
+
+    def stats(self):
+        return {'hits': self.hits, 'misses': self.misses, 'levels': len(self.levels), 'max_levels': self.max_levels}
+
+
+class LevelPrefetcher:
+    def __init__(self, cache, make_tilemap, map_path):
+        self.cache = cache
+        self.make_tilemap = make_tilemap
+        self.map_path = map_path
+        self.lock = threading.Lock()
+        self.workers = {}
+
+    def request(self, map_id):
+        with self.lock:
+            if map_id in self.workers or map_id in self.cache:
+                return
+            worker = threading.Thread(target=self.prepare, args=(map_id,), daemon=True)
+            self.workers[map_id] = worker
+        worker.start()
+
+    def prepare(self, map_id):
+        tilemap = self.make_tilemap()
+        try:
+            self.cache.put(prepare_level(tilemap, map_id, self.map_path(map_id)))
+        finally:
+            tilemap.close()
+            with self.lock:
+                del self.workers[map_id]
+
+    def ready(self, map_id):
+        return map_id in self.cache
+
+    def take(self, map_id):
+        with self.lock:
+            worker = self.workers.get(map_id)
+        if worker:
+            worker.join()
+        return self.cache.get(map_id)
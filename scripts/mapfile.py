@@ -0,0 +1,164 @@
+import sys
+import json
+import mmap
+import struct
+from array import array
+
+from scripts.tilegrid import TileGrid, TileChunk, CHUNK_SIZE, CHUNK_AREA
+
+MAGIC = b'PSMP'
+VERSION = 1
+BINARY_EXTENSION = '.map'
+
+HEADER = struct.Struct('<4sHHHHHII')
+DIRECTORY_ENTRY = struct.Struct('<iiIH')
+OFFGRID_ENTRY = struct.Struct('<HHdd')
+CHUNK_BYTES = CHUNK_AREA * 4
+
+
+def read_json(path):
+    f = open(path, 'r')
+    map_data = json.load(f)
+    f.close()
+    return map_data
+
+
+def write_json(path, map_data):
+    f = open(path, 'w')
+    json.dump(map_data, f)
+    f.close()
+
+
+def grid_from_json(map_data):
+    grid = TileGrid()
+    for tile in map_data['tilemap'].values():
+        grid.set(int(tile['pos'][0]), int(tile['pos'][1]), tile['type'], tile['variant'])
+    return grid
+
+
+def json_from_grid(grid, tile_size, offgrid):
+    tilemap = {}
+    for x, y, type_id, variant in grid.tiles():
+        tilemap[str(x) + ';' + str(y)] = {'type': grid.type_names[type_id], 'variant': variant, 'pos': [x, y]}
+    return {'tilemap': tilemap, 'tile_size': tile_size, 'offgrid': offgrid}
+
+
+def write_map(path, grid, tile_size, offgrid):
+    grid.fetch_all()
+    type_names = grid.type_names[1:]
+    for tile in offgrid:
+        if tile['type'] not in type_names:
+            type_names.append(tile['type'])
+    type_ids = {tile_type: i + 1 for i, tile_type in enumerate(type_names)}
+
+    string_table = b''
+    for tile_type in type_names:
+        encoded = tile_type.encode('utf-8')
+        string_table += struct.pack('<B', len(encoded)) + encoded
+
+    keys = sorted(grid.chunks)
+    payload_offset = (HEADER.size + len(string_table) + DIRECTORY_ENTRY.size * len(keys) +
+                      OFFGRID_ENTRY.size * len(offgrid))
+
+    f = open(path, 'wb')
+    f.write(HEADER.pack(MAGIC, VERSION, tile_size, CHUNK_SIZE, len(type_names), len(grid.type_names) - 1,
+                        len(keys), len(offgrid)))
+    f.write(string_table)
+    for i, key in enumerate(keys):
+        f.write(DIRECTORY_ENTRY.pack(key[0], key[1], payload_offset + i * CHUNK_BYTES, grid.chunks[key].count))
+    for tile in offgrid:
+        f.write(OFFGRID_ENTRY.pack(type_ids[tile['type']], tile['variant'], tile['pos'][0], tile['pos'][1]))
+    for key in keys:
+        chunk = grid.chunks[key]
+        types, variants = array('H', chunk.types), array('H', chunk.variants)
+        if sys.byteorder == 'big':
+            types.byteswap()
+            variants.byteswap()
+        f.write(types.tobytes())
+        f.write(variants.tobytes())
+    f.close()
+
+
+class MapFile:
+    def __init__(self, path):
+        self.file = open(path, 'rb')
+        self.data = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        self.users = 1
+        self.read_header()
+
+    def read_header(self):
+        (magic, version, self.tile_size, chunk_size, type_count, self.grid_type_count, chunk_count,
+         offgrid_count) = HEADER.unpack_from(self.data, 0)
+        if magic != MAGIC:
+            self.close()
+            raise ValueError('not a PySlice map file')
+        if version != VERSION or chunk_size != CHUNK_SIZE:
+            self.close()
+            raise ValueError('unsupported map version ' + str(version) + ' (chunk size ' + str(chunk_size) + ')')
+
+        offset = HEADER.size
+        self.type_names = [None]
+        for _ in range(type_count):
+            length = self.data[offset]
+            self.type_names.append(self.data[offset + 1:offset + 1 + length].decode('utf-8'))
+            offset += 1 + length
+
+        self.directory = {}
+        self.tile_count = 0
+        for _ in range(chunk_count):
+            cx, cy, chunk_offset, count = DIRECTORY_ENTRY.unpack_from(self.data, offset)
+            self.directory[(cx, cy)] = (chunk_offset, count)
+            self.tile_count += count
+            offset += DIRECTORY_ENTRY.size
+
+        self.offgrid = []
+        for _ in range(offgrid_count):
+            type_id, variant, x, y = OFFGRID_ENTRY.unpack_from(self.data, offset)
+            self.offgrid.append({'type': self.type_names[type_id], 'variant': variant, 'pos': [x, y]})
+            offset += OFFGRID_ENTRY.size
+
+    def read_chunk(self, key):
+        offset, count = self.directory[key]
+        chunk = TileChunk()
+        chunk.types = array('H', self.data[offset:offset + CHUNK_AREA * 2])
+        chunk.variants = array('H', self.data[offset + CHUNK_AREA * 2:offset + CHUNK_BYTES])
+        if sys.byteorder == 'big':
+            chunk.types.byteswap()
+            chunk.variants.byteswap()
+        chunk.count = count
+        return chunk
+
+    def share(self):
+        self.users += 1
+        return self
+
+    def close(self):
+        self.users -= 1
+        if self.users <= 0 and self.data:
+            self.data.close()
+            self.file.close()
+            self.data = None
+
+
+def convert(src, dst):
+    if src.endswith(BINARY_EXTENSION):
+        grid = TileGrid()
+        source = MapFile(src)
+        tile_size, offgrid = source.tile_size, source.offgrid
+        grid.attach(source)
+        write_json(dst, json_from_grid(grid, tile_size, offgrid))
+    else:
+        map_data = read_json(src)
+        write_map(dst, grid_from_json(map_data), map_data['tile_size'], map_data['offgrid'])
+
+
+def main(args):
+    if len(args) != 2:
+        print('usage: python -m scripts.mapfile <src.json|src.map> <dst.map|dst.json>')
+        return 1
+    convert(args[0], args[1])
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,188 @@
+import sys
+import json
+import random
+import argparse
+
+from scripts.tilegrid import TileGrid
+from scripts.tilemap import AUTOTILE_SHIFTS, AUTOTILE_VARIANTS, PHYSICS_TILES
+from scripts.mapfile import BINARY_EXTENSION, write_map
+
+TILE_SIZE = 16
+STRIP_WIDTH = 64
+PLATFORM_WIDTH = (3, 24)
+PLATFORM_DEPTH = (1, 4)
+GRASS_CHANCE = 0.7
+DEFAULT_VARIANT = 1
+HEADROOM = 3
+MIN_WIDTH = PLATFORM_WIDTH[0] + 1
+MIN_HEIGHT = HEADROOM + PLATFORM_DEPTH[1] + 1
+DECOR_CHOICES = [('large_decor', 0, 9), ('large_decor', 1, 12), ('decor', 0, 16), ('decor', 1, 16),
+                 ('decor', 2, 16), ('decor', 3, 16)]
+TREE_HEIGHT = 44
+SPAWNER_SIZE = (8, 15)
+
+
+def quota(total, start, end, width):
+    return total * end // width - total * start // width
+
+
+class MapGenerator:
+    def __init__(self, width, height, density=0.12, decor_density=0.08, trees=10, spawners=20, seed=0,
+                 strip_width=STRIP_WIDTH, tile_size=TILE_SIZE):
+        if min(width, strip_width) < MIN_WIDTH or height < MIN_HEIGHT:
+            raise ValueError('map must be at least ' + str(MIN_WIDTH) + 'x' + str(MIN_HEIGHT) +
+                             ' tiles with strips at least ' + str(MIN_WIDTH) + ' wide')
+        self.width = width
+        self.height = height
+        self.density = density
+        self.decor_density = decor_density
+        self.trees = trees
+        self.spawners = spawners
+        self.seed = seed
+        self.strip_width = strip_width
+        self.tile_size = tile_size
+        self.player_placed = False
+
+    def strips(self):
+        self.player_placed = False
+        for index, start in enumerate(range(0, self.width, self.strip_width)):
+            end = min(start + self.strip_width, self.width)
+            rng = random.Random(self.seed * 1000003 + index)
+            cells = self.terrain(rng, start, end)
+            yield self.autotile(cells), self.decorate(rng, cells, start, end)
+
+    def terrain(self, rng, start, end):
+        cells = {}
+        usable = end - start - 1
+        if usable < PLATFORM_WIDTH[0]:
+            return cells
+        target = int(self.density * (end - start) * self.height)
+        attempts = 0
+        while len(cells) < target and attempts < target * 4 + 16:
+            attempts += 1
+            width = rng.randint(PLATFORM_WIDTH[0], min(PLATFORM_WIDTH[1], usable))
+            depth = rng.randint(*PLATFORM_DEPTH)
+            x0 = rng.randint(start, end - 1 - width)
+            y0 = rng.randint(HEADROOM, self.height - PLATFORM_DEPTH[1] - 1)
+            tile_type = 'grass' if rng.random() < GRASS_CHANCE else 'stone'
+            for x in range(x0, x0 + width):
+                column_depth = depth if x in (x0, x0 + width - 1) else depth + rng.randint(0, 1)
+                for y in range(y0, y0 + column_depth):
+                    cells[(x, y)] = tile_type
+        if not cells and not self.player_placed:
+            for x in range(start, start + PLATFORM_WIDTH[0]):
+                cells[(x, HEADROOM)] = 'grass'
+        return cells
+
+    def autotile(self, cells):
+        tiles = []
+        for (x, y), tile_type in sorted(cells.items()):
+            mask = 0
+            for i, shift in enumerate(AUTOTILE_SHIFTS):
+                if cells.get((x + shift[0], y + shift[1])) == tile_type:
+                    mask |= 1 << i
+            variant = AUTOTILE_VARIANTS[mask]
+            tiles.append((x, y, tile_type, DEFAULT_VARIANT if variant is None else variant))
+        return tiles
+
+    def surfaces(self, cells):
+        return sorted((x, y) for (x, y), tile_type in cells.items() if tile_type in PHYSICS_TILES and
+                      not any((x, y - i) in cells for i in range(1, HEADROOM + 1)))
+
+    def decorate(self, rng, cells, start, end):
+        surfaces = self.surfaces(cells)
+        if not surfaces:
+            return []
+        offgrid = []
+        size = self.tile_size
+
+        if not self.player_placed:
+            x, y = surfaces[0]
+            offgrid.append({'type': 'spawners', 'variant': 0, 'pos': [x * size + 4, y * size - SPAWNER_SIZE[1]]})
+            self.player_placed = True
+
+        for x, y in rng.sample(surfaces, min(len(surfaces), quota(self.spawners, start, end, self.width))):
+            offgrid.append({'type': 'spawners', 'variant': 1, 'pos': [x * size + 4, y * size - SPAWNER_SIZE[1]]})
+
+        for x, y in rng.sample(surfaces, min(len(surfaces), quota(self.trees, start, end, self.width))):
+            offgrid.append({'type': 'large_decor', 'variant': 2,
+                            'pos': [x * size - 8 + rng.random() * 8, y * size - TREE_HEIGHT + 2]})
+
+        for x, y in surfaces:
+            if rng.random() < self.decor_density:
+                tile_type, variant, height = rng.choice(DECOR_CHOICES)
+                offgrid.append({'type': tile_type, 'variant': variant,
+                                'pos': [x * size + rng.random() * 4, y * size - height]})
+        return offgrid
+
+    def map_data(self):
+        tilemap = {}
+        offgrid = []
+        for tiles, decor in self.strips():
+            for x, y, tile_type, variant in tiles:
+                tilemap[str(x) + ';' + str(y)] = {'type': tile_type, 'variant': variant, 'pos': [x, y]}
+            offgrid += decor
+        return {'tilemap': tilemap, 'tile_size': self.tile_size, 'offgrid': offgrid}
+
+    def grid(self):
+        grid = TileGrid()
+        offgrid = []
+        for tiles, decor in self.strips():
+            for x, y, tile_type, variant in tiles:
+                grid.set(x, y, tile_type, variant)
+            offgrid += decor
+        return grid, offgrid
+
+    def write_json(self, path):
+        f = open(path, 'w')
+        f.write('{"tilemap": {')
+        offgrid = []
+        count = 0
+        for tiles, decor in self.strips():
+            for x, y, tile_type, variant in tiles:
+                f.write((', ' if count else '') + '"' + str(x) + ';' + str(y) + '": ' +
+                        json.dumps({'type': tile_type, 'variant': variant, 'pos': [x, y]}))
+                count += 1
+            offgrid += decor
+        f.write('}, "tile_size": ' + str(self.tile_size) + ', "offgrid": ')
+        json.dump(offgrid, f)
+        f.write('}')
+        f.close()
+        return count, len(offgrid)
+
+    def write_map(self, path):
+        grid, offgrid = self.grid()
+        write_map(path, grid, self.tile_size, offgrid)
+        return len(grid), len(offgrid)
+
+    def write(self, path):
+        if path.endswith(BINARY_EXTENSION):
+            return self.write_map(path)
+        return self.write_json(path)
+
+
+def main(args):
+    parser = argparse.ArgumentParser(prog='python -m scripts.mapgen')
+    parser.add_argument('path', help='output .json (streamed) or ' + BINARY_EXTENSION)
+    parser.add_argument('--width', type=int, default=1000)
+    parser.add_argument('--height', type=int, default=100)
+    parser.add_argument('--density', type=float, default=0.12, help='fraction of grid cells filled')
+    parser.add_argument('--decor', type=float, default=0.08, help='off-grid decor chance per surface tile')
+    parser.add_argument('--trees', type=int, default=10)
+    parser.add_argument('--spawners', type=int, default=20)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--strip', type=int, default=STRIP_WIDTH, help='columns generated at a time')
+    args = parser.parse_args(args)
+
+    try:
+        generator = MapGenerator(args.width, args.height, density=args.density, decor_density=args.decor,
+                                 trees=args.trees, spawners=args.spawners, seed=args.seed, strip_width=args.strip)
+    except ValueError as e:
+        parser.error(str(e))
+    tiles, offgrid = generator.write(args.path)
+    print('wrote ' + args.path + ': ' + str(tiles) + ' tiles, ' + str(offgrid) + ' off-grid')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
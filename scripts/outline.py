@@ -0,0 +1,35 @@
+import numpy
+import pygame
+
+OUTLINE_OFFSETS = [(-1, 0), (1, 0), (0, -1), (0, 1)]
+OUTLINE_ALPHA = 180
+SHADOW_ALPHA = 75
+SHADOW_OFFSET = (4, 4)
+MASK_THRESHOLD = 127
+
+
+class SilhouetteRenderer:
+    def __init__(self, size):
+        self.size = size
+        self.outline = pygame.Surface(size, pygame.SRCALPHA)
+        self.shadow = pygame.Surface(size, pygame.SRCALPHA)
+        self.outline.fill((0, 0, 0, 0))
+        self.shadow.fill((0, 0, 0, 0))
+        self.mask = numpy.zeros(size, dtype=numpy.bool_)
+
+    def update_mask(self, source):
+        alpha = pygame.surfarray.pixels_alpha(source)
+        numpy.greater(alpha, MASK_THRESHOLD, out=self.mask)
+        del alpha
+
+        for surf, value in [(self.outline, OUTLINE_ALPHA), (self.shadow, SHADOW_ALPHA)]:
+            alpha = pygame.surfarray.pixels_alpha(surf)
+            alpha[...] = self.mask
+            alpha *= value
+            del alpha
+
+    def render(self, source, dest):
+        self.update_mask(source)
+        for offset in OUTLINE_OFFSETS:
+            dest.blit(self.outline, offset)
+        dest.blit(self.shadow, SHADOW_OFFSET)
@@ -1,27 +1,154 @@
-class Particle:
-    def __init__(self, game, p_type, pos, velocity=None, frame=0):
-        if velocity is None:
-            velocity = [0, 0]
-        self.game = game
-        self.type = p_type
-        self.pos = list(pos)
-        self.velocity = list(velocity)
-        self.animation = self.game.assets['particle/' + p_type].copy()
-        self.animation.frame = frame
-
-    def update(self):
-        kill = False
-        if self.animation.done:
-            kill = True
-
-        self.pos[0] += self.velocity[0]
-        self.pos[1] += self.velocity[1]
-
-        self.animation.update()
-
-        return kill
-
-    def render(self, surf, offset=(0, 0)):
-        img = self.animation.img()
-        surf.blit(img, (self.pos[0] - offset[0] - img.get_width() // 2,
-                        self.pos[1] - offset[1] - img.get_height() // 2))
+import math
+import random
+
+import numpy
+
+from scripts.pool import ArrayPool
+
+
+COIN_SPEED = 5
+COIN_DISTANCE = 30
+COIN_HOVER_STEPS = 18
+COIN_PICKUP_DISTANCE = 3
+COIN_OUTBOUND, COIN_HOVERING, COIN_RETURNING = 0, 1, 2
+LEAF_SWAY_RATE = 0.035
+LEAF_SWAY = 0.3
+
+
+class ParticleSystem(ArrayPool):
+    def __init__(self, assets, capacity=1024, grow=True):
+        self.assets = assets
+        self.type_ids = {}
+        self.images = []
+        self.half_w = numpy.zeros(0, dtype=numpy.int32)
+        self.half_h = numpy.zeros(0, dtype=numpy.int32)
+        self.image_base = numpy.zeros(0, dtype=numpy.int32)
+        self.img_dur = numpy.zeros(0, dtype=numpy.int32)
+        self.total = numpy.zeros(0, dtype=numpy.int32)
+        self.loop = numpy.zeros(0, dtype=numpy.bool_)
+        super().__init__(capacity, grow)
+
+    def create_columns(self, capacity):
+        self.pos = numpy.zeros((capacity, 2))
+        self.velocity = numpy.zeros((capacity, 2))
+        self.frame = numpy.zeros(capacity, dtype=numpy.int32)
+        self.kind = numpy.zeros(capacity, dtype=numpy.int32)
+        self.done = numpy.zeros(capacity, dtype=numpy.bool_)
+        self.coin_state = numpy.zeros(capacity, dtype=numpy.int8)
+        self.coin_angle = numpy.zeros(capacity)
+        self.coin_hover = numpy.zeros(capacity, dtype=numpy.int32)
+
+    def columns(self):
+        return [self.pos, self.velocity, self.frame, self.kind, self.done,
+                self.coin_state, self.coin_angle, self.coin_hover]
+
+    def type_id(self, p_type):
+        if p_type not in self.type_ids:
+            clip = self.assets['particle/' + p_type]
+            self.type_ids[p_type] = len(self.type_ids)
+            self.image_base = numpy.append(self.image_base, len(self.images))
+            self.images.extend(clip.images)
+            self.half_w = numpy.append(self.half_w, [img.get_width() // 2 for img in clip.images])
+            self.half_h = numpy.append(self.half_h, [img.get_height() // 2 for img in clip.images])
+            self.img_dur = numpy.append(self.img_dur, clip.img_duration)
+            self.total = numpy.append(self.total, clip.length)
+            self.loop = numpy.append(self.loop, clip.loop)
+        return self.type_ids[p_type]
+
+    def spawn(self, p_type, pos, velocity=(0, 0), frame=0):
+        kind = self.type_id(p_type)
+        i = self.acquire()
+        if i is None:
+            return
+        self.pos[i] = pos
+        self.velocity[i] = velocity
+        self.frame[i] = frame
+        self.kind[i] = kind
+        if p_type == 'coin':
+            self.coin_angle[i] = random.uniform(0, 2 * math.pi)
+
+    def update(self, target=(0, 0)):
+        n = self.count
+        if not n:
+            return 0
+
+        kind = self.kind[:n]
+        kill = self.done[:n].copy()
+        pos = self.pos[:n]
+        pos += self.velocity[:n]
+        self.animate(kind)
+
+        if 'leaf' in self.type_ids:
+            leaves = kind == self.type_ids['leaf']
+            pos[leaves, 0] += numpy.sin(self.frame[:n][leaves] * LEAF_SWAY_RATE) * LEAF_SWAY
+
+        collected = 0
+        if 'coin' in self.type_ids:
+            coins = kind == self.type_ids['coin']
+            if coins.any():
+                picked = self.update_coins(coins, target)
+                kill[coins] = picked[coins]
+                collected = int(numpy.count_nonzero(picked))
+
+        self.remove(kill)
+        return collected
+
+    def animate(self, kind):
+        n = self.count
+        total = self.total[kind]
+        loop = self.loop[kind]
+        frame = self.frame[:n] + 1
+        frame = numpy.where(loop, frame % total, numpy.minimum(frame, total - 1))
+        self.frame[:n] = frame
+        self.done[:n] |= ~loop & (frame >= total - 1)
+
+    def render(self, surf, offset=(0, 0), edges=None):
+        n = self.count
+        if not n:
+            self.drawn = self.culled = 0
+            return
+
+        pos = self.pos[:n]
+        kind = self.kind[:n]
+        frame = self.frame[:n]
+        visible = self.visible(pos, edges)
+        self.count_drawn(visible)
+        if visible is not None:
+            pos, kind, frame = pos[visible], kind[visible], frame[visible]
+
+        image = self.image_base[kind] + frame // self.img_dur[kind]
+        xs = pos[:, 0] - offset[0] - self.half_w[image]
+        ys = pos[:, 1] - offset[1] - self.half_h[image]
+        surf.blits(zip(map(self.images.__getitem__, image.tolist()), zip(xs.tolist(), ys.tolist())), False)
+
+    def update_coins(self, coins, target):
+        n = self.count
+        pos = self.pos[:n]
+        state = self.coin_state[:n]
+        outbound = coins & (state == COIN_OUTBOUND)
+        hovering = coins & (state == COIN_HOVERING)
+        returning = coins & (state == COIN_RETURNING)
+        picked = numpy.zeros(n, dtype=numpy.bool_)
+
+        if outbound.any():
+            angle = self.coin_angle[:n][outbound]
+            pos[outbound, 0] += numpy.cos(angle) * COIN_SPEED
+            pos[outbound, 1] += numpy.sin(angle) * COIN_SPEED
+            away = outbound & (numpy.hypot(pos[:, 0] - target[0], pos[:, 1] - target[1]) >= COIN_DISTANCE)
+            state[away] = COIN_HOVERING
+            self.coin_hover[:n][away] = 0
+
+        if hovering.any():
+            self.coin_hover[:n][hovering] += 1
+            state[hovering & (self.coin_hover[:n] >= COIN_HOVER_STEPS)] = COIN_RETURNING
+
+        if returning.any():
+            dx = target[0] - pos[returning, 0]
+            dy = target[1] - pos[returning, 1]
+            direction = numpy.arctan2(dy, dx)
+            pos[returning, 0] += numpy.cos(direction) * COIN_SPEED
+            pos[returning, 1] += numpy.sin(direction) * COIN_SPEED
+            picked[returning] = numpy.hypot(pos[returning, 0] - target[0],
+                                            pos[returning, 1] - target[1]) <= COIN_PICKUP_DISTANCE
+
+        return picked
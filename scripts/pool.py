@@ -0,0 +1,96 @@
+import numpy
+
+DEFAULT_POOL_SIZES = {'particles': 2048, 'sparks': 512, 'projectiles': 128}
+
+
+class ArrayPool:
+    def __init__(self, capacity=64, grow=True):
+        self.count = 0
+        self.can_grow = grow
+        self.hits = 0
+        self.misses = 0
+        self.dropped = 0
+        self.high_water = 0
+        self.drawn = 0
+        self.culled = 0
+        self.allocate(capacity)
+
+    def __len__(self):
+        return self.count
+
+    def allocate(self, capacity):
+        self.capacity = capacity
+        self.create_columns(capacity)
+
+    def create_columns(self, capacity):
+        pass
+
+    def columns(self):
+        return []
+
+    def grow(self):
+        columns = self.columns()
+        count = self.count
+        self.allocate(max(1, self.capacity * 2))
+        for new, old in zip(self.columns(), columns):
+            new[:count] = old[:count]
+
+    def acquire(self):
+        if self.count < self.capacity:
+            self.hits += 1
+        elif self.can_grow:
+            self.misses += 1
+            self.grow()
+        else:
+            self.dropped += 1
+            return None
+
+        i = self.count
+        for column in self.columns():
+            column[i] = 0
+        self.count += 1
+        self.high_water = max(self.high_water, self.count)
+        return i
+
+    def clear(self):
+        self.count = 0
+
+    def remove(self, kill):
+        dead = numpy.flatnonzero(kill)
+        if not len(dead):
+            return
+        count = self.count - len(dead)
+        holes = dead[dead < count]
+        movers = numpy.flatnonzero(~kill[count:]) + count
+        for column in self.columns():
+            column[holes] = column[movers]
+        self.count = count
+
+    def visible(self, pos, edges, extent=0):
+        if edges is None:
+            return None
+        left, top, right, bottom = edges
+        return (pos[:, 0] + extent >= left) & (pos[:, 0] - extent < right) \
+            & (pos[:, 1] + extent >= top) & (pos[:, 1] - extent < bottom)
+
+    def count_drawn(self, visible):
+        self.drawn = self.count if visible is None else int(numpy.count_nonzero(visible))
+        self.culled = self.count - self.drawn
+
+    def reset_stats(self):
+        self.hits = 0
+        self.misses = 0
+        self.dropped = 0
+        self.high_water = self.count
+
+    def stats(self):
+        acquires = self.hits + self.misses + self.dropped
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'dropped': self.dropped,
+            'hit_rate': self.hits / acquires if acquires else 0.0,
+            'live': self.count,
+            'high_water': self.high_water,
+            'capacity': self.capacity,
+        }
@@ -0,0 +1,148 @@
+import time
+import warnings
+import numpy
+import pygame
+
+PRESENT_MODES = ['scale', 'sdl', 'dirty']
+DIRTY_BLOCK_SIZE = 16
+
+
+class Presenter:
+    def __init__(self, size, window_size, mode='scale', overlay_rect=None):
+        if mode not in PRESENT_MODES:
+            raise ValueError('unknown present mode ' + repr(mode) + ', expected one of ' + ', '.join(PRESENT_MODES))
+        if mode == 'sdl':
+            try:
+                from pygame._sdl2.video import Window
+            except ImportError:
+                warnings.warn('this pygame build has no pygame._sdl2, falling back to the scale present mode')
+                mode = 'scale'
+        self.size = size
+        self.window_size = window_size
+        self.mode = mode
+        self.scale = (window_size[0] // size[0], window_size[1] // size[1])
+        self.overlay_rect = pygame.Rect(overlay_rect or (0, 0) + tuple(window_size))
+        self.frames = 0
+        self.total_ns = 0
+        self.total_bytes = 0
+        self.last_ns = 0
+        self.last_bytes = 0
+
+        if mode == 'sdl':
+            self.screen = pygame.display.set_mode(size, pygame.SCALED)
+            Window.from_display_module().size = window_size
+            self.overlay_scale = 1 / self.scale[0]
+        else:
+            self.overlay_scale = 1
+            self.screen = pygame.display.set_mode(window_size)
+            self.scaled = pygame.Surface(window_size, 0, self.screen)
+
+        self.blocks = (size[0] // DIRTY_BLOCK_SIZE, size[1] // DIRTY_BLOCK_SIZE)
+        self.block_aligned = not size[0] % DIRTY_BLOCK_SIZE and not size[1] % DIRTY_BLOCK_SIZE
+        self.previous = None
+        self.changed = None
+        self.full_refresh = True
+        self.update_rects = None
+        self.overlay_blocks = pygame.Rect(
+            self.overlay_rect.x // self.scale[0] // DIRTY_BLOCK_SIZE,
+            self.overlay_rect.y // self.scale[1] // DIRTY_BLOCK_SIZE,
+            -(-self.overlay_rect.w // self.scale[0] // DIRTY_BLOCK_SIZE),
+            -(-self.overlay_rect.h // self.scale[1] // DIRTY_BLOCK_SIZE))
+
+    def to_display(self, rect):
+        return pygame.Rect(rect.x // self.scale[0], rect.y // self.scale[1],
+                           rect.w // self.scale[0], rect.h // self.scale[1])
+
+    def to_window(self, rect):
+        return pygame.Rect(rect.x * self.scale[0], rect.y * self.scale[1],
+                           rect.w * self.scale[0], rect.h * self.scale[1])
+
+    def present(self, frame, offset):
+        start = time.perf_counter_ns()
+        if self.mode == 'sdl':
+            self.last_bytes = self.present_sdl(frame, offset)
+        elif self.mode == 'dirty':
+            self.last_bytes = self.present_dirty(frame, offset)
+        else:
+            self.last_bytes = self.present_scaled(frame, offset)
+        self.last_ns = time.perf_counter_ns() - start
+
+    def flip(self):
+        start = time.perf_counter_ns()
+        if self.update_rects is None:
+            pygame.display.flip()
+        else:
+            pygame.display.update(self.update_rects)
+        self.last_ns += time.perf_counter_ns() - start
+        self.frames += 1
+        self.total_ns += self.last_ns
+        self.total_bytes += self.last_bytes
+
+    def present_scaled(self, frame, offset):
+        if int(offset[0]) == 0 and int(offset[1]) == 0:
+            pygame.transform.scale(frame, self.window_size, self.screen)
+        else:
+            pygame.transform.scale(frame, self.window_size, self.scaled)
+            self.screen.blit(self.scaled, offset)
+        self.update_rects = None
+        return self.window_size[0] * self.window_size[1] * self.screen.get_bytesize()
+
+    def present_sdl(self, frame, offset):
+        self.screen.blit(frame, (offset[0] / self.scale[0], offset[1] / self.scale[1]))
+        self.update_rects = None
+        return self.size[0] * self.size[1] * self.screen.get_bytesize()
+
+    def present_dirty(self, frame, offset):
+        shaking = int(offset[0]) != 0 or int(offset[1]) != 0
+        if shaking or self.full_refresh or not self.block_aligned or frame.get_bytesize() != 4:
+            self.store_frame(frame)
+            self.full_refresh = shaking
+            return self.present_scaled(frame, offset)
+
+        pixels = pygame.surfarray.pixels2d(frame)
+        numpy.not_equal(pixels, self.previous, out=self.changed)
+        self.previous[...] = pixels
+        del pixels
+        blocks = self.changed.reshape(self.blocks[0], DIRTY_BLOCK_SIZE,
+                                      self.blocks[1], DIRTY_BLOCK_SIZE).any(axis=(1, 3))
+        ob = self.overlay_blocks
+        blocks[ob.left:ob.right, ob.top:ob.bottom] = True
+
+        rects = []
+        for y in range(self.blocks[1]):
+            x = 0
+            while x < self.blocks[0]:
+                if blocks[x, y]:
+                    start = x
+                    while x < self.blocks[0] and blocks[x, y]:
+                        x += 1
+                    rect = pygame.Rect(start * DIRTY_BLOCK_SIZE, y * DIRTY_BLOCK_SIZE,
+                                       (x - start) * DIRTY_BLOCK_SIZE, DIRTY_BLOCK_SIZE)
+                    window_rect = self.to_window(rect)
+                    pygame.transform.scale(frame.subsurface(rect), window_rect.size,
+                                           self.screen.subsurface(window_rect))
+                    rects.append(window_rect)
+                x += 1
+
+        self.update_rects = rects
+        return sum(rect.w * rect.h for rect in rects) * self.screen.get_bytesize()
+
+    def store_frame(self, frame):
+        if frame.get_bytesize() != 4:
+            return
+        pixels = pygame.surfarray.pixels2d(frame)
+        if self.previous is None:
+            self.previous = numpy.empty_like(pixels)
+            self.changed = numpy.empty(pixels.shape, dtype=numpy.bool_)
+        self.previous[...] = pixels
+        del pixels
+
+    def stats(self):
+        return {
+            'mode': self.mode,
+            'frames': self.frames,
+            'last_ms': self.last_ns / 1e6,
+            'avg_ms': self.total_ns / self.frames / 1e6 if self.frames else 0.0,
+            'last_bytes': self.last_bytes,
+            'avg_bytes': self.total_bytes / self.frames if self.frames else 0.0,
+        }
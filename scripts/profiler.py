@@ -0,0 +1,199 @@
+import json
+import time
+from array import array
+
+import pygame
+
+HISTORY = 240
+EVENTS_PER_FRAME = 32
+FRAME_BUDGET_NS = 16_666_667
+GRAPH_SIZE = (120, 48)
+GRAPH_SCALE_NS = FRAME_BUDGET_NS * 2
+LEGEND_REFRESH = 30
+STAGE_COLORS = [(230, 25, 75), (60, 180, 75), (255, 225, 25), (0, 130, 200), (245, 130, 48), (145, 30, 180),
+                (70, 240, 240), (240, 50, 230), (210, 245, 60), (250, 190, 212), (0, 128, 128), (220, 190, 255),
+                (170, 110, 40), (255, 250, 200), (128, 0, 0), (170, 255, 195), (128, 128, 0), (255, 215, 180)]
+
+
+class FrameProfiler:
+    def __init__(self, history=HISTORY, enabled=False, clock=time.perf_counter_ns):
+        self.history = history
+        self.enabled = enabled
+        self.pending_enabled = None
+        self.clock = clock
+        self.stages = {}
+        self.counts = {}
+        self.frame_start = array('q', bytes(8 * history))
+        self.frame_total = array('q', bytes(8 * history))
+        self.event_capacity = history * EVENTS_PER_FRAME
+        self.event_stage = array('H', bytes(2 * self.event_capacity))
+        self.event_start = array('q', bytes(8 * self.event_capacity))
+        self.event_length = array('q', bytes(8 * self.event_capacity))
+        self.stage_names = []
+        self.stage_ids = {}
+        self.events = 0
+        self.frames = 0
+        self.slot = 0
+        self.last = 0
+
+    def stage_id(self, name):
+        if name not in self.stage_ids:
+            self.stage_ids[name] = len(self.stage_names)
+            self.stage_names.append(name)
+            self.stages[name] = array('q', bytes(8 * self.history))
+        return self.stage_ids[name]
+
+    def enable_next_frame(self, enabled):
+        self.pending_enabled = enabled
+
+    def begin_frame(self):
+        if self.pending_enabled is not None:
+            self.enabled = self.pending_enabled
+            self.pending_enabled = None
+        if not self.enabled:
+            return
+        self.slot = self.frames % self.history
+        for times in self.stages.values():
+            times[self.slot] = 0
+        for values in self.counts.values():
+            values[self.slot] = 0
+        self.last = self.frame_start[self.slot] = self.clock()
+
+    def mark(self, name):
+        if not self.enabled:
+            return
+        now = self.clock()
+        stage = self.stage_ids.get(name)
+        if stage is None:
+            stage = self.stage_id(name)
+        self.stages[name][self.slot] += now - self.last
+        i = self.events % self.event_capacity
+        self.event_stage[i] = stage
+        self.event_start[i] = self.last
+        self.event_length[i] = now - self.last
+        self.events += 1
+        self.last = now
+
+    def skip(self):
+        if self.enabled:
+            self.last = self.clock()
+
+    def count(self, name, value):
+        if not self.enabled:
+            return
+        if name not in self.counts:
+            self.counts[name] = array('q', bytes(8 * self.history))
+        self.counts[name][self.slot] = value
+
+    def end_frame(self):
+        if not self.enabled:
+            return
+        self.frame_total[self.slot] = self.clock() - self.frame_start[self.slot]
+        self.frames += 1
+
+    def reset(self):
+        self.__init__(self.history, self.enabled, self.clock)
+
+    def recorded_slots(self):
+        filled = min(self.frames, self.history)
+        return [(self.frames - filled + i) % self.history for i in range(filled)]
+
+    def averages(self):
+        slots = self.recorded_slots()
+        if not slots:
+            return {}
+        return {name: sum(times[slot] for slot in slots) / len(slots) / 1e6 for name, times in self.stages.items()}
+
+    def write_csv(self, path):
+        names = list(self.stages)
+        counts = list(self.counts)
+        f = open(path, 'w')
+        f.write(','.join(['frame', 'total_ms'] + [name + '_ms' for name in names] + counts) + '\n')
+        for frame, slot in enumerate(self.recorded_slots(), self.frames - min(self.frames, self.history)):
+            row = [str(frame), format(self.frame_total[slot] / 1e6, '.4f')]
+            row += [format(self.stages[name][slot] / 1e6, '.4f') for name in names]
+            row += [str(self.counts[name][slot]) for name in counts]
+            f.write(','.join(row) + '\n')
+        f.close()
+
+    def write_chrome_trace(self, path):
+        events = []
+        first = max(0, self.events - self.event_capacity)
+        for n in range(first, self.events):
+            i = n % self.event_capacity
+            events.append({'name': self.stage_names[self.event_stage[i]], 'ph': 'X', 'pid': 0, 'tid': 0,
+                           'ts': self.event_start[i] / 1000, 'dur': self.event_length[i] / 1000})
+        for slot in self.recorded_slots():
+            if self.counts:
+                events.append({'name': 'objects', 'ph': 'C', 'pid': 0, 'ts': self.frame_start[slot] / 1000,
+                               'args': {name: values[slot] for name, values in self.counts.items()}})
+        f = open(path, 'w')
+        json.dump({'traceEvents': events, 'displayTimeUnit': 'ms'}, f)
+        f.close()
+
+    def export(self, path):
+        if path.endswith('.json'):
+            self.write_chrome_trace(path)
+        else:
+            self.write_csv(path)
+
+
+class ProfilerOverlay:
+    def __init__(self, profiler, text, size=GRAPH_SIZE, presenter=None):
+        self.profiler = profiler
+        self.text = text
+        self.presenter = presenter
+        self.graph = pygame.Surface(size, pygame.SRCALPHA)
+        self.budget_y = size[1] - size[1] * FRAME_BUDGET_NS // GRAPH_SCALE_NS
+        self.legend = []
+        self.refresh = 0
+        self.visible = False
+
+    def toggle(self):
+        self.visible = not self.visible
+        self.graph.fill((0, 0, 0, 0))
+        self.refresh = 0
+
+    def plot(self):
+        profiler = self.profiler
+        if not profiler.frames:
+            return
+        slot = (profiler.frames - 1) % profiler.history
+        width, height = self.graph.get_size()
+        self.graph.scroll(-1, 0)
+        self.graph.fill((0, 0, 0, 160), (width - 1, 0, 1, height))
+        y = height
+        for i, name in enumerate(profiler.stage_names):
+            size = profiler.stages[name][slot] * height // GRAPH_SCALE_NS
+            if size:
+                self.graph.fill(STAGE_COLORS[i % len(STAGE_COLORS)], (width - 1, y - size, 1, size))
+                y -= size
+        self.graph.set_at((width - 1, self.budget_y), (255, 255, 255))
+
+    def update_legend(self):
+        self.legend = []
+        averages = self.profiler.averages()
+        for i, name in enumerate(self.profiler.stage_names):
+            label = name + ' ' + format(averages.get(name, 0), '.2f')
+            self.legend.append(self.text.render(label, STAGE_COLORS[i % len(STAGE_COLORS)], outline=1))
+        counts = ' '.join(name + ' ' + str(values[(self.profiler.frames - 1) % self.profiler.history])
+                          for name, values in self.profiler.counts.items())
+        if counts:
+            self.legend.append(self.text.render(counts, (255, 255, 255), outline=1))
+        if self.presenter:
+            stats = self.presenter.stats()
+            label = 'present {} {:.2f} ms {} KB'.format(stats['mode'], stats['last_ms'], stats['last_bytes'] // 1024)
+            self.legend.append(self.text.render(label, (255, 255, 255), outline=1))
+
+    def render(self, surf, pos=(4, 52)):
+        if not self.visible:
+            return
+        self.plot()
+        if not self.refresh:
+            self.update_legend()
+        self.refresh = (self.refresh + 1) % LEGEND_REFRESH
+        surf.blit(self.graph, pos)
+        y = pos[1]
+        for label in self.legend:
+            surf.blit(label, (pos[0] + self.graph.get_width() + 4, y))
+            y += label.get_height() - 2
@@ -0,0 +1,92 @@
+from enum import IntEnum
+
+import numpy
+
+from scripts.pool import ArrayPool
+
+
+class Weapon(IntEnum):
+    GUN = 0
+    SHOTGUN = 1
+    RIFLE = 2
+
+
+WEAPON_SPEED = numpy.array([[1.5, 0.0], [1.0, 1.0], [2.0, 1.0]])
+PROJECTILE_LIFETIME = 360
+
+
+class ProjectileSystem(ArrayPool):
+    def __init__(self, image, capacity=64, grow=True):
+        self.image = image
+        self.half_size = (image.get_width() / 2, image.get_height() / 2)
+        super().__init__(capacity, grow)
+
+    def create_columns(self, capacity):
+        self.pos = numpy.zeros((capacity, 2))
+        self.velocity = numpy.zeros((capacity, 2))
+        self.timer = numpy.zeros(capacity, dtype=numpy.int32)
+        self.weapon = numpy.zeros(capacity, dtype=numpy.int8)
+        self.held = numpy.zeros(capacity, dtype=numpy.bool_)
+        self.delay = numpy.zeros(capacity, dtype=numpy.int32)
+
+    def columns(self):
+        return [self.pos, self.velocity, self.timer, self.weapon, self.held, self.delay]
+
+    def spawn(self, pos, velocity, weapon, timer=0, held=False, delay=0):
+        i = self.acquire()
+        if i is None:
+            return
+        self.pos[i] = pos
+        self.velocity[i] = velocity
+        self.timer[i] = timer
+        self.weapon[i] = weapon
+        self.held[i] = held
+        self.delay[i] = delay
+
+    def update(self):
+        n = self.count
+        if not n:
+            return 0
+        timer = self.timer[:n]
+        delay = self.delay[:n]
+        held = self.held[:n]
+        weapon = self.weapon[:n]
+
+        timer -= timer > 0
+        fired = (delay == 0) & (weapon == Weapon.RIFLE)
+        delay -= delay > 0
+        delay[fired] = -1
+
+        moving = ~held | (timer <= 0)
+        self.pos[:n][moving] += self.velocity[:n][moving] * WEAPON_SPEED[weapon[moving]]
+        timer += ~held
+        return int(numpy.count_nonzero(fired))
+
+    def render(self, surf, offset=(0, 0), edges=None):
+        pos = self.pos[:self.count]
+        visible = self.visible(pos, edges)
+        self.count_drawn(visible)
+        if visible is not None:
+            pos = pos[visible]
+        xs = pos[:, 0] - self.half_size[0] - offset[0]
+        ys = pos[:, 1] - self.half_size[1] - offset[1]
+        surf.blits([(self.image, pos) for pos in zip(xs.tolist(), ys.tolist())], False)
+
+    def collide(self, collision, target=None):
+        n = self.count
+        if not n:
+            return [], []
+        pos = self.pos[:n]
+        hit_tile = collision.solid_points(pos[:, 0], pos[:, 1])
+        expired = ~hit_tile & (self.timer[:n] > PROJECTILE_LIFETIME)
+        hit_target = numpy.zeros(n, dtype=numpy.bool_)
+        if target is not None:
+            xs = numpy.trunc(pos[:, 0])
+            ys = numpy.trunc(pos[:, 1])
+            hit_target = ~hit_tile & ~expired & (xs >= target.left) & (xs < target.right) \
+                & (ys >= target.top) & (ys < target.bottom)
+
+        tile_hits = [(tuple(pos[i]), tuple(self.velocity[i])) for i in numpy.flatnonzero(hit_tile)]
+        target_hits = [tuple(pos[i]) for i in numpy.flatnonzero(hit_target)]
+        self.remove(hit_tile | expired | hit_target)
+        return tile_hits, target_hits
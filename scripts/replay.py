@@ -0,0 +1,145 @@
+import time
+import zlib
+import struct
+from array import array
+
+from scripts.inputs import ScriptedInput
+
+MAGIC = b'PSRP'
+VERSION = 1
+CHECKSUM_INTERVAL = 60
+
+HEADER = struct.Struct('<4sHqHHII')
+
+LEFT, RIGHT, JUMP, DASH = 1, 2, 4, 8
+
+
+def pack_input(left, right, jump, dash):
+    return (LEFT if left else 0) | (RIGHT if right else 0) | (JUMP if jump else 0) | (DASH if dash else 0)
+
+
+def unpack_input(bits):
+    return bool(bits & LEFT), bool(bits & RIGHT), bool(bits & JUMP), bool(bits & DASH)
+
+
+def state_checksum(game):
+    player = game.player
+    state = repr((game.level, game.dead, game.coin_count, player.pos, player.velocity, player.action, player.flip,
+                  player.dashing, [(enemy.pos, enemy.flip, enemy.walking) for enemy in game.enemies],
+                  len(game.projectiles), len(game.sparks), len(game.particles)))
+    checksum = zlib.crc32(state.encode())
+    for pool in [game.projectiles, game.sparks, game.particles]:
+        checksum = zlib.crc32(pool.pos[:pool.count].tobytes(), checksum)
+    return checksum
+
+
+class Recording:
+    def __init__(self, seed, level=0, interval=CHECKSUM_INTERVAL):
+        self.seed = seed
+        self.level = level
+        self.interval = interval
+        self.frames = bytearray()
+        self.checksums = array('I')
+
+    def __len__(self):
+        return len(self.frames)
+
+    def inputs(self):
+        return ScriptedInput([unpack_input(bits) for bits in self.frames])
+
+    def save(self, path):
+        f = open(path, 'wb')
+        f.write(HEADER.pack(MAGIC, VERSION, self.seed, self.level, self.interval, len(self.frames),
+                            len(self.checksums)))
+        f.write(bytes(self.frames))
+        f.write(struct.pack('<' + str(len(self.checksums)) + 'I', *self.checksums))
+        f.close()
+
+    @staticmethod
+    def load(path):
+        f = open(path, 'rb')
+        data = f.read()
+        f.close()
+        magic, version, seed, level, interval, frame_count, checksum_count = HEADER.unpack_from(data)
+        if magic != MAGIC:
+            raise ValueError('not a PySlice recording')
+        if version != VERSION:
+            raise ValueError('unsupported recording version ' + str(version))
+        recording = Recording(seed, level, interval)
+        recording.frames = bytearray(data[HEADER.size:HEADER.size + frame_count])
+        recording.checksums = array('I', struct.unpack_from('<' + str(checksum_count) + 'I', data,
+                                                            HEADER.size + frame_count))
+        return recording
+
+
+class Recorder:
+    def __init__(self, recording, path=None):
+        self.recording = recording
+        self.path = path
+
+    def save(self):
+        if self.path:
+            self.recording.save(self.path)
+
+    def record_input(self, game):
+        self.recording.frames.append(pack_input(game.movement[0], game.movement[1], game.jump_pressed,
+                                                game.dash_pressed))
+
+    def record_state(self, game):
+        if not len(self.recording) % self.recording.interval:
+            self.recording.checksums.append(state_checksum(game))
+
+
+class ReplayResult:
+    def __init__(self, frames, timings, mismatches):
+        self.frames = frames
+        self.timings = timings
+        self.mismatches = mismatches
+
+    def ok(self):
+        return not self.mismatches
+
+    def percentile(self, fraction):
+        ordered = sorted(self.timings)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))] if ordered else 0
+
+    def summary(self):
+        return {
+            'frames': self.frames,
+            'total_ms': sum(self.timings) / 1e6,
+            'median_ms': self.percentile(0.5) / 1e6,
+            'p99_ms': self.percentile(0.99) / 1e6,
+            'max_ms': max(self.timings, default=0) / 1e6,
+            'mismatches': len(self.mismatches),
+        }
+
+    def write_timings(self, path):
+        f = open(path, 'w')
+        f.write('frame,ns\n')
+        for frame, ns in enumerate(self.timings):
+            f.write(str(frame) + ',' + str(ns) + '\n')
+        f.close()
+
+
+def replay(game, recording, render=False, stop_on_mismatch=False):
+    inputs = recording.inputs()
+    timings = []
+    mismatches = []
+    clock = time.perf_counter_ns
+    for frame in range(len(recording)):
+        start = clock()
+        inputs.poll(game)
+        game.update()
+        if render:
+            game.render()
+        timings.append(clock() - start)
+
+        if not (frame + 1) % recording.interval:
+            index = (frame + 1) // recording.interval - 1
+            if index < len(recording.checksums):
+                actual = state_checksum(game)
+                if actual != recording.checksums[index]:
+                    mismatches.append((frame, recording.checksums[index], actual))
+                    if stop_on_mismatch:
+                        break
+    return ReplayResult(len(timings), timings, mismatches)
@@ -0,0 +1,78 @@
+import time
+
+STEP_RATE = 60
+MAX_STEPS_PER_FRAME = 5
+RATE_WINDOW = 1.0
+
+
+class FixedStepScheduler:
+    def __init__(self, step_rate=STEP_RATE, max_steps=MAX_STEPS_PER_FRAME, clock=time.perf_counter):
+        self.step_rate = step_rate
+        self.step = 1 / step_rate
+        self.max_steps = max_steps
+        self.clock = clock
+        self.accumulator = 0.0
+        self.last_time = None
+        self.steps = 0
+        self.renders = 0
+        self.skipped = 0
+        self.dropped = 0.0
+        self.window_start = None
+        self.window_steps = 0
+        self.window_renders = 0
+        self.sim_rate = 0.0
+        self.render_rate = 0.0
+
+    def reset(self):
+        self.accumulator = 0.0
+        self.last_time = None
+
+    def advance(self):
+        now = self.clock()
+        if self.last_time is None:
+            self.last_time = now
+            self.window_start = now
+            self.accumulator = self.step
+        self.accumulator += now - self.last_time
+        self.last_time = now
+
+        steps = int(self.accumulator / self.step)
+        if steps > self.max_steps:
+            self.dropped += (steps - self.max_steps) * self.step
+            self.accumulator -= (steps - self.max_steps) * self.step
+            steps = self.max_steps
+        self.accumulator -= steps * self.step
+
+        self.steps += steps
+        self.window_steps += steps
+        if steps > 1:
+            self.skipped += steps - 1
+        return steps
+
+    def alpha(self):
+        return min(1.0, self.accumulator / self.step)
+
+    def rendered(self):
+        self.renders += 1
+        self.window_renders += 1
+        now = self.clock()
+        elapsed = now - self.window_start
+        if elapsed >= RATE_WINDOW:
+            self.sim_rate = self.window_steps / elapsed
+            self.render_rate = self.window_renders / elapsed
+            self.window_start = now
+            self.window_steps = 0
+            self.window_renders = 0
+            return True
+        return False
+
+    def stats(self):
+        return {
+            'step_rate': self.step_rate,
+            'sim_rate': self.sim_rate,
+            'render_rate': self.render_rate,
+            'steps': self.steps,
+            'renders': self.renders,
+            'skipped_renders': self.skipped,
+            'dropped_ms': self.dropped * 1000,
+        }
@@ -1,30 +1,66 @@
 import math
+import numpy
 import pygame
 
+from scripts.pool import ArrayPool
 
-class Spark:
-    def __init__(self, pos, angle, speed):
-        self.pos = list(pos)
-        self.angle = angle
-        self.speed = speed
+
+SPARK_COLOR = (255, 255, 255)
+SPARK_DRAG = 0.1
+SPARK_LENGTH = 3
+SPARK_WIDTH = 0.5
+
+
+class SparkSystem(ArrayPool):
+    def create_columns(self, capacity):
+        self.pos = numpy.zeros((capacity, 2))
+        self.direction = numpy.zeros((capacity, 2))
+        self.speed = numpy.zeros(capacity)
+
+    def columns(self):
+        return [self.pos, self.direction, self.speed]
+
+    def spawn(self, pos, angle, speed):
+        i = self.acquire()
+        if i is None:
+            return
+        self.pos[i] = pos
+        self.direction[i] = (math.cos(angle), math.sin(angle))
+        self.speed[i] = speed
 
     def update(self):
-        self.pos[0] += math.cos(self.angle) * self.speed
-        self.pos[1] += math.sin(self.angle) * self.speed
-
-        self.speed = max(0, self.speed - 0.1)
-        return not self.speed
-
-    def render(self, surf, offset=(0, 0)):
-        render_points = [
-            (self.pos[0] + math.cos(self.angle) * self.speed * 3 - offset[0],
-             self.pos[1] + math.sin(self.angle) * self.speed * 3 - offset[1]),
-            (self.pos[0] + math.cos(self.angle + math.pi * 0.5) * self.speed * 0.5 - offset[0],
-             self.pos[1] + math.sin(self.angle + math.pi * 0.5) * self.speed * 0.5 - offset[1]),
-            (self.pos[0] + math.cos(self.angle + math.pi) * self.speed * 3 - offset[0],
-             self.pos[1] + math.sin(self.angle + math.pi) * self.speed * 3 - offset[1]),
-            (self.pos[0] + math.cos(self.angle - math.pi * 0.5) * self.speed * 0.5 - offset[0],
-             self.pos[1] + math.sin(self.angle - math.pi * 0.5) * self.speed * 0.5 - offset[1]),
-        ]
-
-        pygame.draw.polygon(surf, (255, 255, 255), render_points)
+        n = self.count
+        speed = self.speed[:n]
+        self.pos[:n] += self.direction[:n] * speed[:, None]
+        numpy.maximum(speed - SPARK_DRAG, 0, out=speed)
+        self.remove(speed == 0)
+
+    def polygons(self, offset=(0, 0), edges=None):
+        n = self.count
+        pos = self.pos[:n]
+        direction = self.direction[:n]
+        speed = self.speed[:n, None]
+        visible = self.visible(pos, edges, speed[:, 0] * SPARK_LENGTH)
+        self.count_drawn(visible)
+        if visible is not None:
+            pos, direction, speed = pos[visible], direction[visible], speed[visible]
+
+        pos = pos - offset
+        tip = direction * (speed * SPARK_LENGTH)
+        side = direction[:, ::-1] * (speed * SPARK_WIDTH)
+        side[:, 0] *= -1
+
+        points = numpy.empty((len(pos), 4, 2))
+        points[:, 0] = pos + tip
+        points[:, 1] = pos + side
+        points[:, 2] = pos - tip
+        points[:, 3] = pos - side
+        return points
+
+    def render(self, surf, offset=(0, 0), edges=None):
+        if not self.count:
+            self.drawn = self.culled = 0
+            return
+        draw = pygame.draw.polygon
+        for points in self.polygons(offset, edges).tolist():
+            draw(surf, SPARK_COLOR, points)
@@ -0,0 +1,61 @@
+class SpatialGrid:
+    def __init__(self, cell_size=64):
+        self.cell_size = cell_size
+        self.clear()
+
+    def __len__(self):
+        return len(self.entries)
+
+    def clear(self):
+        self.cells = {}
+        self.entries = {}
+        self.next_order = 0
+
+    def cells_for(self, rect):
+        x, y, w, h = rect
+        for cx in range(int(x // self.cell_size), int((x + w) // self.cell_size) + 1):
+            for cy in range(int(y // self.cell_size), int((y + h) // self.cell_size) + 1):
+                yield cx, cy
+
+    def insert(self, item, rect):
+        key = id(item)
+        if key in self.entries:
+            self.remove(item)
+        entry = (self.next_order, item, tuple(rect))
+        self.next_order += 1
+        self.entries[key] = entry
+        for cell in self.cells_for(entry[2]):
+            self.cells.setdefault(cell, {})[key] = entry
+
+    def remove(self, item):
+        key = id(item)
+        entry = self.entries.pop(key, None)
+        if entry is None:
+            return False
+        for cell in self.cells_for(entry[2]):
+            bucket = self.cells[cell]
+            del bucket[key]
+            if not bucket:
+                del self.cells[cell]
+        return True
+
+    def query_rect(self, rect):
+        x, y, w, h = rect
+        found = {}
+        for cell in self.cells_for(rect):
+            bucket = self.cells.get(cell)
+            if bucket:
+                for key, entry in bucket.items():
+                    ex, ey, ew, eh = entry[2]
+                    if ex < x + w and x < ex + ew and ey < y + h and y < ey + eh:
+                        found[key] = entry
+        return [entry[1] for entry in sorted(found.values(), key=lambda entry: entry[0])]
+
+    def query_point(self, pos):
+        x, y = pos
+        bucket = self.cells.get((int(x // self.cell_size), int(y // self.cell_size)))
+        if not bucket:
+            return []
+        found = [entry for entry in bucket.values()
+                 if entry[2][0] <= x < entry[2][0] + entry[2][2] and entry[2][1] <= y < entry[2][1] + entry[2][3]]
+        return [entry[1] for entry in sorted(found, key=lambda entry: entry[0])]
@@ -0,0 +1,286 @@
+from array import array
+from collections.abc import MutableMapping
+
+CHUNK_SHIFT = 4
+CHUNK_SIZE = 1 << CHUNK_SHIFT
+CHUNK_MASK = CHUNK_SIZE - 1
+CHUNK_AREA = CHUNK_SIZE * CHUNK_SIZE
+
+EMPTY = 0
+TILE_KEYS = ('type', 'variant', 'pos')
+
+
+def chunk_index(x, y):
+    return ((y & CHUNK_MASK) << CHUNK_SHIFT) | (x & CHUNK_MASK)
+
+
+class TileChunk:
+    def __init__(self):
+        self.types = array('H', bytes(CHUNK_AREA * 2))
+        self.variants = array('H', bytes(CHUNK_AREA * 2))
+        self.count = 0
+        self.revision = 0
+
+    def copy(self):
+        chunk = TileChunk.__new__(TileChunk)
+        chunk.types = array('H', self.types)
+        chunk.variants = array('H', self.variants)
+        chunk.count = self.count
+        chunk.revision = self.revision
+        return chunk
+
+
+class TileGrid:
+    def __init__(self, solid_types=()):
+        self.chunks = {}
+        self.type_names = [None]
+        self.type_ids = {}
+        self.solid_types = set(solid_types)
+        self.solid_flags = [False]
+        self.count = 0
+        self.revision = 0
+        self.source = None
+        self.pending = set()
+        self.fetch_revisions = {}
+        self.on_change = None
+        self.on_fetch = None
+
+    def __len__(self):
+        return self.count
+
+    def __contains__(self, loc):
+        return self.type_at(loc[0], loc[1]) != EMPTY
+
+    def clear(self):
+        self.detach()
+        self.chunks = {}
+        self.count = 0
+        self.type_names = [None]
+        self.type_ids = {}
+        self.solid_flags = [False]
+
+    def snapshot(self):
+        grid = TileGrid(self.solid_types)
+        grid.restore(self)
+        return grid
+
+    def restore(self, other):
+        self.detach()
+        self.chunks = {key: chunk.copy() for key, chunk in other.chunks.items()}
+        self.count = other.count
+        self.type_names = list(other.type_names)
+        self.type_ids = dict(other.type_ids)
+        self.solid_flags = [tile_type in self.solid_types for tile_type in self.type_names]
+        self.revision = max(self.revision, other.revision)
+        if other.source:
+            self.source = other.source.share()
+            self.pending = set(other.pending)
+            self.fetch_revisions = other.fetch_revisions
+
+    def attach(self, source):
+        self.clear()
+        for tile_type in source.type_names[1:source.grid_type_count + 1]:
+            self.type_id(tile_type)
+        self.source = source
+        self.pending = set(source.directory)
+        self.fetch_revisions = {key: self.revision + i for i, key in enumerate(source.directory, 1)}
+        self.revision += len(self.fetch_revisions)
+        self.count = source.tile_count
+
+    def detach(self):
+        if self.source:
+            self.source.close()
+        self.source = None
+        self.pending = set()
+        self.fetch_revisions = {}
+
+    def fetch(self, key):
+        if key not in self.pending:
+            return None
+        self.pending.remove(key)
+        chunk = self.chunks[key] = self.source.read_chunk(key)
+        chunk.revision = self.fetch_revisions[key]
+        if self.on_fetch:
+            self.on_fetch(key, chunk)
+        if not self.pending:
+            self.detach()
+        return chunk
+
+    def fetch_all(self):
+        for key in list(self.pending):
+            self.fetch(key)
+
+    def chunk_keys(self):
+        return set(self.chunks) | self.pending
+
+    def chunk(self, key):
+        chunk = self.chunks.get(key)
+        if chunk is None and self.pending:
+            chunk = self.fetch(key)
+        return chunk
+
+    def type_id(self, tile_type):
+        if tile_type not in self.type_ids:
+            self.type_ids[tile_type] = len(self.type_names)
+            self.type_names.append(tile_type)
+            self.solid_flags.append(tile_type in self.solid_types)
+        return self.type_ids[tile_type]
+
+    def touch(self, chunk):
+        self.revision += 1
+        chunk.revision = self.revision
+
+    def type_at(self, x, y):
+        chunk = self.chunks.get((x >> CHUNK_SHIFT, y >> CHUNK_SHIFT))
+        if chunk is None and self.pending:
+            chunk = self.fetch((x >> CHUNK_SHIFT, y >> CHUNK_SHIFT))
+        if chunk is None:
+            return EMPTY
+        return chunk.types[((y & CHUNK_MASK) << CHUNK_SHIFT) | (x & CHUNK_MASK)]
+
+    def solid_at(self, x, y):
+        chunk = self.chunks.get((x >> CHUNK_SHIFT, y >> CHUNK_SHIFT))
+        if chunk is None and self.pending:
+            chunk = self.fetch((x >> CHUNK_SHIFT, y >> CHUNK_SHIFT))
+        if chunk is None:
+            return False
+        return self.solid_flags[chunk.types[((y & CHUNK_MASK) << CHUNK_SHIFT) | (x & CHUNK_MASK)]]
+
+    def get(self, x, y):
+        chunk = self.chunks.get((x >> CHUNK_SHIFT, y >> CHUNK_SHIFT))
+        if chunk is None and self.pending:
+            chunk = self.fetch((x >> CHUNK_SHIFT, y >> CHUNK_SHIFT))
+        if chunk is None:
+            return EMPTY, 0
+        i = ((y & CHUNK_MASK) << CHUNK_SHIFT) | (x & CHUNK_MASK)
+        return chunk.types[i], chunk.variants[i]
+
+    def set(self, x, y, tile_type, variant):
+        key = (x >> CHUNK_SHIFT, y >> CHUNK_SHIFT)
+        chunk = self.chunk(key)
+        if chunk is None:
+            chunk = self.chunks[key] = TileChunk()
+        i = chunk_index(x, y)
+        type_id = self.type_id(tile_type)
+        if chunk.types[i] == type_id and chunk.variants[i] == variant:
+            return
+        if chunk.types[i] == EMPTY:
+            chunk.count += 1
+            self.count += 1
+        chunk.types[i] = type_id
+        chunk.variants[i] = variant
+        self.touch(chunk)
+        if self.on_change:
+            self.on_change(x, y)
+
+    def set_variant(self, x, y, variant):
+        chunk = self.chunk((x >> CHUNK_SHIFT, y >> CHUNK_SHIFT))
+        i = chunk_index(x, y)
+        if chunk.variants[i] != variant:
+            chunk.variants[i] = variant
+            self.touch(chunk)
+
+    def remove(self, x, y):
+        key = (x >> CHUNK_SHIFT, y >> CHUNK_SHIFT)
+        chunk = self.chunk(key)
+        if chunk is None:
+            return False
+        i = chunk_index(x, y)
+        if chunk.types[i] == EMPTY:
+            return False
+        chunk.types[i] = EMPTY
+        chunk.variants[i] = 0
+        chunk.count -= 1
+        self.count -= 1
+        self.touch(chunk)
+        if not chunk.count:
+            del self.chunks[key]
+        if self.on_change:
+            self.on_change(x, y)
+        return True
+
+    def tiles(self):
+        self.fetch_all()
+        for (cx, cy), chunk in self.chunks.items():
+            base_x = cx << CHUNK_SHIFT
+            base_y = cy << CHUNK_SHIFT
+            types = chunk.types
+            variants = chunk.variants
+            for i in range(CHUNK_AREA):
+                if types[i] != EMPTY:
+                    yield base_x + (i & CHUNK_MASK), base_y + (i >> CHUNK_SHIFT), types[i], variants[i]
+
+
+class TileRef(MutableMapping):
+    # a live 'x;y' tile: type and variant write through to the grid, pos is fixed
+    def __init__(self, grid, x, y):
+        self.grid = grid
+        self.x = x
+        self.y = y
+
+    def __getitem__(self, key):
+        type_id, variant = self.grid.get(self.x, self.y)
+        if type_id == EMPTY or key not in TILE_KEYS:
+            raise KeyError(key)
+        if key == 'type':
+            return self.grid.type_names[type_id]
+        if key == 'variant':
+            return variant
+        return [self.x, self.y]
+
+    def __setitem__(self, key, value):
+        if key == 'type':
+            self.grid.set(self.x, self.y, value, self['variant'])
+        elif key == 'variant':
+            self.grid.set(self.x, self.y, self['type'], value)
+        else:
+            raise TypeError('tile ' + repr(key) + ' is read-only, move tiles with Tilemap.set_tile/remove_tile')
+
+    def __delitem__(self, key):
+        raise TypeError('tile keys cannot be deleted')
+
+    def __iter__(self):
+        return iter(TILE_KEYS)
+
+    def __len__(self):
+        return len(TILE_KEYS)
+
+    def __repr__(self):
+        return repr(self.copy())
+
+    def copy(self):
+        return dict(self)
+
+
+class TileDictView(MutableMapping):
+    def __init__(self, grid):
+        self.grid = grid
+
+    @staticmethod
+    def parse_key(key):
+        x, y = key.split(';')
+        return int(x), int(y)
+
+    def __getitem__(self, key):
+        x, y = self.parse_key(key)
+        if self.grid.type_at(x, y) == EMPTY:
+            raise KeyError(key)
+        return TileRef(self.grid, x, y)
+
+    def __setitem__(self, key, tile):
+        x, y = self.parse_key(key)
+        self.grid.set(x, y, tile['type'], tile['variant'])
+
+    def __delitem__(self, key):
+        if not self.grid.remove(*self.parse_key(key)):
+            raise KeyError(key)
+
+    def __contains__(self, key):
+        return self.parse_key(key) in self.grid
+
+    def __iter__(self):
+        for x, y, _, _ in list(self.grid.tiles()):
+            yield str(x) + ';' + str(y)
+
+    def __len__(self):
+        return len(self.grid)
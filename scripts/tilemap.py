@@ -1,6 +1,13 @@
-import json
+from itertools import count
+
 import pygame
 
+from scripts.tilegrid import TileGrid, TileDictView, EMPTY, CHUNK_SHIFT, CHUNK_SIZE, CHUNK_AREA, CHUNK_MASK
+from scripts.mapfile import MapFile, BINARY_EXTENSION, read_json, write_json, write_map, json_from_grid
+from scripts.chunk_cache import ChunkSurfaceCache
+from scripts.spatial import SpatialGrid
+from scripts.collision import CollisionLayer, NEIGHBOR_OFFSETS
+
 AUTOTILE_MAP = {
     tuple(sorted([(1, 0), (0, 1)])): 0,
     tuple(sorted([(1, 0), (0, 1), (-1, 0)])): 1,
@@ -13,100 +20,288 @@ AUTOTILE_MAP = {
     tuple(sorted([(1, 0), (-1, 0), (0, 1), (0, -1)])): 8,
 }
 
-NEIGHBOR_OFFSETS = [(-1, 0), (-1, -1), (0, -1), (1, -1), (1, 0), (0, 0), (-1, 1), (0, 1), (1, 1)]
+AUTOTILE_SHIFTS = [(1, 0), (-1, 0), (0, -1), (0, 1)]
+AUTOTILE_VARIANTS = [AUTOTILE_MAP.get(tuple(sorted(shift for i, shift in enumerate(AUTOTILE_SHIFTS)
+                                                     if mask & (1 << i))))
+                     for mask in range(1 << len(AUTOTILE_SHIFTS))]
 
 PHYSICS_TILES = {'grass', 'stone'}
 AUTOTILE_TYPES = {'grass', 'stone'}
+SNAPSHOT_GENERATIONS = count(1)
+NEIGHBOR_INDEX_OFFSETS = [(ox, oy, (oy << CHUNK_SHIFT) + ox) for ox, oy in NEIGHBOR_OFFSETS]
+
+
+class TilemapSnapshot:
+    def __init__(self, tilemap):
+        self.generation = next(SNAPSHOT_GENERATIONS)
+        self.grid = tilemap.grid.snapshot()
+        self.tile_size = tilemap.tile_size
+        self.offgrid_tiles = [tile.copy() for tile in tilemap.offgrid_tiles]
+        self.collision = tilemap.collision.snapshot()
+
+    def close(self):
+        self.grid.detach()
 
 
 class Tilemap:
     def __init__(self, game, tile_size=16):
         self.game = game
         self.tile_size = tile_size
-        self.tilemap = {}
+        self.grid = TileGrid(solid_types=PHYSICS_TILES)
+        self.tilemap = TileDictView(self.grid)
         self.offgrid_tiles = []
+        self.offgrid_index = SpatialGrid(cell_size=tile_size * 4)
+        self.chunk_cache = ChunkSurfaceCache()
+        self.generation = None
+        self.collision = CollisionLayer(self.grid, tile_size)
+        self.autotile_dirty = None
+        self.grid.on_change = self.tile_changed
 
-    def extract(self, id_pairs, keep=False):
+    def tile_changed(self, x, y):
+        self.collision.update(x, y)
+        if self.autotile_dirty is not None:
+            self.autotile_dirty.add((x, y))
+
+    def extract(self, id_pairs, keep=False, rect=None):
         matches = []
-        for tile in self.offgrid_tiles.copy():
+        candidates = self.offgrid_tiles if rect is None else self.offgrid_in_rect(rect)
+        removed = []
+        for tile in candidates:
             if (tile['type'], tile['variant']) in id_pairs:
                 matches.append(tile.copy())
                 if not keep:
-                    self.offgrid_tiles.remove(tile)
+                    self.offgrid_index.remove(tile)
+                    removed.append(id(tile))
+        if removed:
+            removed = set(removed)
+            self.offgrid_tiles = [tile for tile in self.offgrid_tiles if id(tile) not in removed]
 
-        for loc in self.tilemap:
-            tile = self.tilemap[loc]
-            if (tile['type'], tile['variant']) in id_pairs:
-                matches.append(tile.copy())
-                matches[-1]['pos'] = matches[-1]['pos'].copy()
-                matches[-1]['pos'][0] *= self.tile_size
-                matches[-1]['pos'][1] *= self.tile_size
+        if not any(pair[0] in self.grid.type_ids for pair in id_pairs):
+            return matches
+
+        for x, y, type_id, variant in list(self.grid.tiles()):
+            if rect is not None and not self.tile_in_rect(x, y, rect):
+                continue
+            tile_type = self.grid.type_names[type_id]
+            if (tile_type, variant) in id_pairs:
+                matches.append({'type': tile_type, 'variant': variant,
+                                'pos': [x * self.tile_size, y * self.tile_size]})
                 if not keep:
-                    del self.tilemap[loc]
+                    self.grid.remove(x, y)
 
         return matches
 
     def save(self, path):
-        f = open(path, 'w')
-        json.dump({'tilemap': self.tilemap, 'tile_size': self.tile_size, 'offgrid': self.offgrid_tiles}, f)
-        f.close()
+        if path.endswith(BINARY_EXTENSION):
+            write_map(path, self.grid, self.tile_size, self.offgrid_tiles)
+        else:
+            write_json(path, json_from_grid(self.grid, self.tile_size, self.offgrid_tiles))
 
     def load(self, path):
-        f = open(path, 'r')
-        map_data = json.load(f)
-        f.close()
+        if path.endswith(BINARY_EXTENSION):
+            self.load_binary(path)
+        else:
+            self.load_map_data(read_json(path))
 
-        self.tilemap = map_data['tilemap']
+    def load_map_data(self, map_data):
+        self.grid.on_change = None
+        self.grid.clear()
+        for tile in map_data['tilemap'].values():
+            self.grid.set(int(tile['pos'][0]), int(tile['pos'][1]), tile['type'], tile['variant'])
         self.tile_size = map_data['tile_size']
         self.offgrid_tiles = map_data['offgrid']
+        self.rebuild_indexes()
+
+    def load_binary(self, path):
+        source = MapFile(path)
+        self.grid.attach(source)
+        self.tile_size = source.tile_size
+        self.offgrid_tiles = source.offgrid
+        self.rebuild_indexes()
+
+    def close(self):
+        self.grid.detach()
+
+    def snapshot(self):
+        snapshot = TilemapSnapshot(self)
+        self.generation = snapshot.generation
+        return snapshot
+
+    def restore(self, snapshot):
+        self.grid.on_change = None
+        if snapshot.generation != self.generation:
+            self.chunk_cache.clear()
+            self.generation = snapshot.generation
+        self.grid.restore(snapshot.grid)
+        self.tile_size = snapshot.tile_size
+        self.offgrid_tiles = [tile.copy() for tile in snapshot.offgrid_tiles]
+        self.index_offgrid()
+        self.collision.restore(snapshot.collision)
+        self.autotile_dirty = None
+        self.grid.on_change = self.tile_changed
+
+    def rebuild_indexes(self):
+        self.chunk_cache.clear()
+        self.generation = None
+        self.index_offgrid()
+        self.collision.rebuild(self.tile_size)
+        self.autotile_dirty = None
+        self.grid.on_change = self.tile_changed
+
+    def tile_in_rect(self, x, y, rect):
+        return (x * self.tile_size < rect[0] + rect[2] and rect[0] < (x + 1) * self.tile_size and
+                y * self.tile_size < rect[1] + rect[3] and rect[1] < (y + 1) * self.tile_size)
+
+    def offgrid_rect(self, tile):
+        if self.game and tile['type'] in self.game.assets:
+            size = self.game.assets[tile['type']][tile['variant']].get_size()
+        else:
+            size = (self.tile_size, self.tile_size)
+        return tile['pos'][0], tile['pos'][1], size[0], size[1]
+
+    def index_offgrid(self):
+        self.offgrid_index = SpatialGrid(cell_size=self.tile_size * 4)
+        for tile in self.offgrid_tiles:
+            self.offgrid_index.insert(tile, self.offgrid_rect(tile))
+
+    def add_offgrid_tile(self, tile):
+        self.offgrid_tiles.append(tile)
+        self.offgrid_index.insert(tile, self.offgrid_rect(tile))
+
+    def remove_offgrid_tile(self, tile):
+        self.offgrid_index.remove(tile)
+        self.offgrid_tiles.remove(tile)
+
+    def offgrid_in_rect(self, rect):
+        return self.offgrid_index.query_rect(rect)
+
+    def offgrid_at(self, pos):
+        return self.offgrid_index.query_point(pos)
+
+    def set_tile(self, loc, tile_type, variant):
+        self.grid.set(loc[0], loc[1], tile_type, variant)
+
+    def remove_tile(self, loc):
+        return self.grid.remove(loc[0], loc[1])
 
     def solid_check(self, pos):
-        tile_loc = str(int(pos[0] // self.tile_size)) + ';' + str(int(pos[1] // self.tile_size))
-        if tile_loc in self.tilemap:
-            if self.tilemap[tile_loc]['type'] in PHYSICS_TILES:
-                return self.tilemap[tile_loc]
+        return self.collision.solid(int(pos[0] // self.tile_size), int(pos[1] // self.tile_size))
 
     def tiles_around(self, pos):
         tiles = []
-        tile_loc = (int(pos[0] // self.tile_size), int(pos[1] // self.tile_size))
-        for offset in NEIGHBOR_OFFSETS:
-            check_loc = str(tile_loc[0] + offset[0]) + ';' + str(tile_loc[1] + offset[1])
-            if check_loc in self.tilemap:
-                tiles.append(self.tilemap[check_loc])
+        grid = self.grid
+        tx, ty = int(pos[0] // self.tile_size), int(pos[1] // self.tile_size)
+        if 0 < tx & CHUNK_MASK < CHUNK_MASK and 0 < ty & CHUNK_MASK < CHUNK_MASK:
+            chunk = grid.chunk((tx >> CHUNK_SHIFT, ty >> CHUNK_SHIFT))
+            if chunk is None:
+                return tiles
+            types, variants, names = chunk.types, chunk.variants, grid.type_names
+            base = ((ty & CHUNK_MASK) << CHUNK_SHIFT) | (tx & CHUNK_MASK)
+            for ox, oy, offset in NEIGHBOR_INDEX_OFFSETS:
+                type_id = types[base + offset]
+                if type_id != EMPTY:
+                    tiles.append((tx + ox, ty + oy, names[type_id], variants[base + offset]))
+            return tiles
+        for ox, oy in NEIGHBOR_OFFSETS:
+            type_id, variant = grid.get(tx + ox, ty + oy)
+            if type_id != EMPTY:
+                tiles.append((tx + ox, ty + oy, grid.type_names[type_id], variant))
         return tiles
 
     def physics_rects_around(self, pos):
         rects = []
-        for tile in self.tiles_around(pos):
-            if tile['type'] in PHYSICS_TILES:
-                rects.append(
-                    pygame.Rect(tile['pos'][0] * self.tile_size, tile['pos'][1] * self.tile_size, self.tile_size,
-                                self.tile_size))
+        tile_loc = (int(pos[0] // self.tile_size), int(pos[1] // self.tile_size))
+        for offset in NEIGHBOR_OFFSETS:
+            x, y = tile_loc[0] + offset[0], tile_loc[1] + offset[1]
+            if self.collision.solid(x, y):
+                rects.append(pygame.Rect(x * self.tile_size, y * self.tile_size, self.tile_size, self.tile_size))
         return rects
 
-    def autotile(self):
-        for loc in self.tilemap:
-            tile = self.tilemap[loc]
-            neighbors = set()
-            for shift in [(1, 0), (-1, 0), (0, -1), (0, 1)]:
-                check_loc = str(tile['pos'][0] + shift[0]) + ';' + str(tile['pos'][1] + shift[1])
-                if check_loc in self.tilemap:
-                    if self.tilemap[check_loc]['type'] == tile['type']:
-                        neighbors.add(shift)
-            neighbors = tuple(sorted(neighbors))
-            if (tile['type'] in AUTOTILE_TYPES) and (neighbors in AUTOTILE_MAP):
-                tile['variant'] = AUTOTILE_MAP[neighbors]
+    def autotile(self, full=False):
+        if full or self.autotile_dirty is None:
+            self.autotile_full()
+        else:
+            cells = set()
+            for x, y in self.autotile_dirty:
+                cells.add((x, y))
+                for shift in AUTOTILE_SHIFTS:
+                    cells.add((x + shift[0], y + shift[1]))
+            for x, y in cells:
+                self.autotile_cell(x, y)
+        self.autotile_dirty = set()
+
+    def autotile_type_ids(self):
+        return {self.grid.type_ids[tile_type] for tile_type in AUTOTILE_TYPES if tile_type in self.grid.type_ids}
+
+    def autotile_cell(self, x, y):
+        type_id = self.grid.type_at(x, y)
+        if type_id == EMPTY or self.grid.type_names[type_id] not in AUTOTILE_TYPES:
+            return
+        mask = 0
+        for i, shift in enumerate(AUTOTILE_SHIFTS):
+            if self.grid.type_at(x + shift[0], y + shift[1]) == type_id:
+                mask |= 1 << i
+        variant = AUTOTILE_VARIANTS[mask]
+        if variant is not None:
+            self.grid.set_variant(x, y, variant)
+
+    def autotile_full(self):
+        self.grid.fetch_all()
+        type_ids = self.autotile_type_ids()
+        type_at = self.grid.type_at
+        for key, chunk in self.grid.chunks.items():
+            base_x = key[0] << CHUNK_SHIFT
+            base_y = key[1] << CHUNK_SHIFT
+            types = chunk.types
+            variants = chunk.variants
+            changed = False
+            for i in range(CHUNK_AREA):
+                type_id = types[i]
+                if type_id not in type_ids:
+                    continue
+                lx = i & CHUNK_MASK
+                ly = i >> CHUNK_SHIFT
+                right = types[i + 1] if lx < CHUNK_MASK else type_at(base_x + lx + 1, base_y + ly)
+                left = types[i - 1] if lx else type_at(base_x + lx - 1, base_y + ly)
+                up = types[i - CHUNK_SIZE] if ly else type_at(base_x + lx, base_y + ly - 1)
+                down = types[i + CHUNK_SIZE] if ly < CHUNK_MASK else type_at(base_x + lx, base_y + ly + 1)
+                variant = AUTOTILE_VARIANTS[(right == type_id) | (left == type_id) << 1 |
+                                            (up == type_id) << 2 | (down == type_id) << 3]
+                if variant is not None and variants[i] != variant:
+                    variants[i] = variant
+                    changed = True
+            if changed:
+                self.grid.touch(chunk)
 
     def render(self, surf, offset=(0, 0)):
-        for tile in self.offgrid_tiles:
+        decor = self.offgrid_in_rect((offset[0], offset[1], surf.get_width(), surf.get_height()))
+        for tile in decor:
             surf.blit(self.game.assets[tile['type']][tile['variant']],
                       (tile['pos'][0] - offset[0], tile['pos'][1] - offset[1]))
 
-        for x in range(offset[0] // self.tile_size, (offset[0] + surf.get_width()) // self.tile_size + 1):
-            for y in range(offset[1] // self.tile_size, (offset[1] + surf.get_height()) // self.tile_size + 1):
-                loc = str(x) + ';' + str(y)
-                if loc in self.tilemap:
-                    tile = self.tilemap[loc]
-                    surf.blit(self.game.assets[tile['type']][tile['variant']],
-                              (tile['pos'][0] * self.tile_size - offset[0],
-                               tile['pos'][1] * self.tile_size - offset[1]))
+        chunk_px = CHUNK_SIZE * self.tile_size
+        for cx in range(offset[0] // chunk_px, (offset[0] + surf.get_width()) // chunk_px + 1):
+            for cy in range(offset[1] // chunk_px, (offset[1] + surf.get_height()) // chunk_px + 1):
+                chunk = self.grid.chunk((cx, cy))
+                if chunk is not None:
+                    chunk_surf = self.chunk_cache.get((cx, cy), chunk.revision,
+                                                      lambda: self.bake_chunk(chunk))
+                    surf.blit(chunk_surf, (cx * chunk_px - offset[0], cy * chunk_px - offset[1]))
+        return len(decor)
+
+    def bake_chunk(self, chunk):
+        images = []
+        width = height = CHUNK_SIZE * self.tile_size
+        for i in range(CHUNK_AREA):
+            type_id = chunk.types[i]
+            if type_id != EMPTY:
+                img = self.game.assets[self.grid.type_names[type_id]][chunk.variants[i]]
+                pos = ((i & CHUNK_MASK) * self.tile_size, (i >> CHUNK_SHIFT) * self.tile_size)
+                images.append((img, pos))
+                width = max(width, pos[0] + img.get_width())
+                height = max(height, pos[1] + img.get_height())
+
+        chunk_surf = pygame.Surface((width, height), pygame.SRCALPHA)
+        images.sort(key=lambda image: image[1])
+        chunk_surf.blits(images, doreturn=False)
+        return chunk_surf
@@ -1,5 +1,6 @@
 import os
 import pygame
+from collections import OrderedDict
 
 BASE_IMG_PATH = 'assets/images/'
 
@@ -21,24 +22,108 @@ def load_images(path):
     return images
 
 
-class Animation:
+class SilentSound:
+    def play(self, *args, **kwargs):
+        pass
+
+    def stop(self):
+        pass
+
+    def set_volume(self, volume):
+        pass
+
+
+def load_sound(path, enabled=True):
+    if not enabled or not pygame.mixer.get_init() or not os.path.exists(path):
+        return SilentSound()
+    return pygame.mixer.Sound(path)
+
+
+class AnimationClip:
     def __init__(self, images, img_dur=5, loop=True):
-        self.images = images
-        self.loop = loop
+        self.images = tuple(images)
         self.img_duration = img_dur
+        self.loop = loop
+        self.length = img_dur * len(self.images)
+        self.last = self.length - 1
+        self.frames = tuple(self.images[frame // img_dur] for frame in range(self.length))
+
+    def play(self, frame=0):
+        return Animation(self, frame)
+
+    def next_frame(self, frame):
+        if self.loop:
+            return (frame + 1) % self.length
+        return min(frame + 1, self.last)
+
+
+class Animation:
+    __slots__ = ('clip', 'frame', 'done')
+
+    def __init__(self, clip, frame=0):
+        self.clip = clip
+        self.frame = frame
         self.done = False
-        self.frame = 0
 
     def copy(self):
-        return Animation(self.images, self.img_duration, self.loop)
+        return Animation(self.clip)
 
     def update(self):
-        if self.loop:
-            self.frame = (self.frame + 1) % (self.img_duration * len(self.images))
-        else:
-            self.frame = min(self.frame + 1, self.img_duration * len(self.images) - 1)
-            if self.frame >= self.img_duration * len(self.images) - 1:
-                self.done = True
+        self.frame = self.clip.next_frame(self.frame)
+        if not self.clip.loop and self.frame >= self.clip.last:
+            self.done = True
 
     def img(self):
-        return self.images[int(self.frame / self.img_duration)]
+        return self.clip.frames[self.frame]
+
+
+class SpriteCache:
+    def __init__(self, max_entries=1024):
+        self.max_entries = max_entries
+        self.variants = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, img, flip_x=False, rotation=0):
+        if not flip_x and not rotation:
+            return img
+        key = (img, flip_x, rotation)
+        variant = self.variants.get(key)
+        if variant is not None:
+            self.hits += 1
+            self.variants.move_to_end(key)
+            return variant
+
+        self.misses += 1
+        return self.store(key)
+
+    def store(self, key):
+        img, flip_x, rotation = key
+        variant = img
+        if rotation:
+            variant = pygame.transform.rotate(variant, rotation)
+        if flip_x:
+            variant = pygame.transform.flip(variant, True, False)
+        self.variants[key] = variant
+        while len(self.variants) > self.max_entries:
+            self.variants.popitem(last=False)
+        return variant
+
+    def warm(self, images, flip_x=True, rotation=0):
+        if isinstance(images, AnimationClip):
+            images = images.images
+        elif isinstance(images, pygame.Surface):
+            images = [images]
+        for img in images:
+            if (flip_x or rotation) and (img, flip_x, rotation) not in self.variants:
+                self.store((img, flip_x, rotation))
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+            'entries': len(self.variants),
+            'max_entries': self.max_entries,
+        }
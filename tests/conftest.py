@@ -0,0 +1,29 @@
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+os.environ.setdefault('PYGAME_HIDE_SUPPORT_PROMPT', '1')
+
+
+@pytest.fixture
+def game(monkeypatch):
+    monkeypatch.chdir(ROOT)
+    from game import Game
+    return Game(headless=True, seed=1)
+
+
+@pytest.fixture
+def binary_game(monkeypatch, tmp_path):
+    monkeypatch.chdir(ROOT)
+    from game import Game
+    from scripts.mapfile import BINARY_EXTENSION, convert
+    for name in os.listdir('assets/maps'):
+        if name.endswith('.json'):
+            convert(os.path.join('assets/maps', name), str(tmp_path / (name[:-5] + BINARY_EXTENSION)))
+    monkeypatch.setattr(Game, 'map_path', lambda self, map_id: str(tmp_path / (str(map_id) + BINARY_EXTENSION)))
+    return Game(headless=True, seed=1)
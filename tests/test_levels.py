@@ -0,0 +1,53 @@
+import pytest
+
+from scripts.levels import LevelCache, LevelPrefetcher, prepare_level
+from scripts.mapfile import write_map
+from scripts.tilegrid import TileGrid
+from scripts.tilemap import Tilemap
+
+
+@pytest.mark.parametrize('fixture', ['game', 'binary_game'])
+def test_restart_after_prefetched_load_keeps_chunk_cache(request, fixture):
+    game = request.getfixturevalue(fixture)
+    game.load_level(1)
+    assert game.level_cache.hits == 1
+    game.render()
+    cache = game.tilemap.chunk_cache
+    chunks = len(cache.entries)
+    assert chunks
+
+    cache.reset_stats()
+    game.load_level(1)
+    game.render()
+    assert cache.misses == 0
+    assert cache.hits == chunks
+
+
+def test_loading_another_level_clears_chunk_cache(game):
+    game.render()
+    level_0 = dict(game.tilemap.chunk_cache.entries)
+    game.load_level(1)
+    assert not set(game.tilemap.chunk_cache.entries.items()) & set(level_0.items())
+
+
+def test_evicted_and_prefetched_levels_release_map_files(tmp_path):
+    path = str(tmp_path / 'level.map')
+    grid = TileGrid()
+    grid.set(0, 0, 'grass', 1)
+    grid.set(40, 3, 'stone', 2)
+    write_map(path, grid, 16, [])
+
+    cache = LevelCache(max_levels=1)
+    prefetcher = LevelPrefetcher(cache, lambda: Tilemap(None), lambda map_id: path)
+    prefetcher.request(0)
+    source = prefetcher.take(0).tilemap.grid.source
+    assert source.users == 1
+
+    tilemap = Tilemap(None)
+    level = prepare_level(tilemap, 1, path)
+    tilemap.close()
+    cache.put(level)
+    assert source.data is None
+    assert level.tilemap.grid.source.users == 1
+    cache.clear()
+    assert level.tilemap.grid.source is None
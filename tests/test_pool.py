@@ -0,0 +1,17 @@
+from scripts.spark import SparkSystem
+
+
+def test_empty_pool_grows_on_first_acquire():
+    sparks = SparkSystem(capacity=0)
+    for i in range(3):
+        sparks.spawn((i, 0), 0, 2)
+    assert len(sparks) == 3
+    assert sparks.pos[:3, 0].tolist() == [0, 1, 2]
+    assert sparks.stats()['capacity'] == 4
+
+
+def test_fixed_empty_pool_drops():
+    sparks = SparkSystem(capacity=0, grow=False)
+    sparks.spawn((0, 0), 0, 2)
+    assert len(sparks) == 0
+    assert sparks.stats()['dropped'] == 1
@@ -0,0 +1,27 @@
+import pytest
+
+from scripts.tilegrid import TileGrid, TileDictView
+
+
+def test_dict_view_writes_through_to_grid():
+    grid = TileGrid(solid_types={'stone'})
+    grid.set(3, -2, 'grass', 1)
+    view = TileDictView(grid)
+
+    tile = view['3;-2']
+    assert tile == {'type': 'grass', 'variant': 1, 'pos': [3, -2]}
+    tile['variant'] = 4
+    view['3;-2']['type'] = 'stone'
+    assert grid.get(3, -2) == (grid.type_ids['stone'], 4)
+    assert grid.solid_at(3, -2)
+    assert tile.copy() == {'type': 'stone', 'variant': 4, 'pos': [3, -2]}
+
+
+def test_dict_view_rejects_moving_tiles():
+    grid = TileGrid()
+    grid.set(0, 0, 'grass', 0)
+    tile = TileDictView(grid)['0;0']
+    with pytest.raises(TypeError):
+        tile['pos'] = [1, 0]
+    with pytest.raises(KeyError):
+        TileDictView(grid)['1;0']